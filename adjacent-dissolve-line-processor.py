@@ -31,6 +31,34 @@
 ***************************************************************************
 """
 
+import cProfile
+import hashlib
+import json
+import math
+import multiprocessing
+import queue
+import re
+import sys
+import sqlite3
+import threading
+import time
+import traceback
+from array import array
+from collections import Counter, OrderedDict
+from contextlib import ExitStack, closing, contextmanager, nullcontext
+from itertools import chain, groupby, repeat
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
 from qgis.PyQt.QtCore import QCoreApplication, QVariant
 from qgis.core import (
     QgsProcessing,
@@ -41,9 +69,16 @@ from qgis.core import (
     QgsProcessingParameterField,
     QgsProcessingParameterBoolean,
     QgsProcessingParameterString,
+    QgsProcessingParameterEnum,
+    QgsProcessingParameterNumber,
+    QgsProcessingParameterFileDestination,
+    QgsProcessingOutputString,
     QgsFeatureSink,
     QgsFeature,
+    QgsFeatureRequest,
     QgsGeometry,
+    QgsCurvePolygon,
+    QgsLineString,
     QgsFields,
     QgsField,
     QgsWkbTypes,
@@ -51,10 +86,1244 @@ from qgis.core import (
     QgsExpression,
     QgsExpressionContext,
     QgsExpressionContextUtils,
-    QgsPointXY
+    QgsPointXY,
+    QgsRectangle,
+    QgsSpatialIndex
 )
 
 
+class UnionFind:
+    """Struttura disjoint-set con path compression e union by size."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, i):
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, a, b):
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return False
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return True
+
+
+class AdjacencyPredicate:
+    """Predicato di adiacenza con prefiltro sui bbox e geometrie preparate in cache."""
+
+    TOUCHES = 0
+    INTERSECTS = 1
+    SHARED_BOUNDARY = 2
+    WITHIN_DISTANCE = 3
+
+    def __init__(self, geometries, rule=TOUCHES, tolerance=0.0):
+        self.geometries = geometries
+        self.rule = rule
+        self.tolerance = tolerance if rule == self.WITHIN_DISTANCE else 0.0
+        self.boxes = [geom.boundingBox() for geom in geometries]
+        self._engines = {}
+        self._boundaries = {}
+
+    def search_box(self, i):
+        """Bounding box di ricerca dei candidati (espanso della tolleranza)."""
+        if self.tolerance > 0:
+            return self.boxes[i].buffered(self.tolerance)
+        return self.boxes[i]
+
+    def engine(self, i):
+        """Restituisce il motore GEOS preparato per la geometria i."""
+        engine = self._engines.get(i)
+        if engine is None:
+            engine = QgsGeometry.createGeometryEngine(self.geometries[i].constGet())
+            engine.prepareGeometry()
+            self._engines[i] = engine
+        return engine
+
+    def boundary(self, i):
+        """Restituisce il boundary della geometria i."""
+        boundary = self._boundaries.get(i)
+        if boundary is None:
+            boundary = QgsGeometry(self.geometries[i].constGet().boundary())
+            self._boundaries[i] = boundary
+        return boundary
+
+    def shared_boundary_length(self, i, j):
+        """Lunghezza del bordo di una geometria contenuto nell'altra."""
+        length = 0.0
+        for a, b in ((i, j), (j, i)):
+            boundary = self.boundary(a)
+            if boundary.isNull():
+                continue
+            shared = self.engine(b).intersection(boundary.constGet())
+            if shared:
+                length = max(length, shared.length())
+        return length
+
+    def adjacent(self, i, j):
+        """Verifica se le geometrie i e j sono adiacenti secondo la regola scelta."""
+        if not self.search_box(i).intersects(self.boxes[j]):
+            return False
+
+        other = self.geometries[j].constGet()
+        if other is None or self.geometries[i].isNull():
+            return False
+
+        if self.rule == self.TOUCHES:
+            return self.engine(i).touches(other)
+        if self.rule == self.INTERSECTS:
+            return self.engine(i).intersects(other)
+        if self.rule == self.SHARED_BOUNDARY:
+            return self.engine(i).intersects(other) and self.shared_boundary_length(i, j) > 0
+        return self.engine(i).distance(other) <= self.tolerance
+
+
+class GroupingEvaluator:
+    """Valuta l'espressione di raggruppamento con cache LRU sui valori degli attributi."""
+
+    CACHE_SIZE = 65536
+
+    # Funzioni e variabili il cui risultato dipende dalla singola feature
+    # (o cambia a ogni chiamata) anche a parita di attributi
+    VOLATILE_FUNCTIONS = {
+        '$id', '$currentfeature', 'rand', 'randf', 'now', 'uuid', 'eval',
+        'get_feature', 'get_feature_by_id', 'aggregate', 'relation_aggregate'
+    }
+    FEATURE_VARIABLES = {'feature', 'id', 'geometry', 'row_number'}
+
+    def __init__(self, expression_text, exp_context, cache_size=CACHE_SIZE):
+        self.expression = QgsExpression(expression_text)
+        self.context = exp_context
+        self.expression.prepare(self.context)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.attribute_indexes = self._memo_attribute_indexes(exp_context.fields())
+
+    def _memo_attribute_indexes(self, fields):
+        """Indici degli attributi da cui dipende l'espressione, None se non memoizzabile."""
+        exp = self.expression
+        if exp.needsGeometry():
+            return None
+        if set(exp.referencedVariableNames()) & self.FEATURE_VARIABLES:
+            return None
+        if set(exp.referencedFunctions()) & self.VOLATILE_FUNCTIONS:
+            return None
+
+        columns = exp.referencedColumns()
+        if QgsFeatureRequest.ALL_ATTRIBUTES in columns:
+            return None
+        indexes = [fields.lookupField(name) for name in sorted(columns)]
+        if -1 in indexes:
+            return None
+        return indexes
+
+    @property
+    def memoized(self):
+        return self.attribute_indexes is not None
+
+    def evaluate(self, feature):
+        """Restituisce la chiave di gruppo (stringa) della feature."""
+        self.context.setFeature(feature)
+        value = self.expression.evaluate(self.context)
+        return str(value) if value is not None else 'NULL'
+
+    def group_key(self, feature):
+        """Come evaluate(), usando la cache quando l'espressione dipende solo dagli attributi."""
+        if self.attribute_indexes is None:
+            return self.evaluate(feature)
+
+        key = []
+        for i in self.attribute_indexes:
+            value = feature.attribute(i)
+            if isinstance(value, QVariant):
+                if not value.isNull():
+                    return self.evaluate(feature)
+                value = None
+            key.append(value)
+        key = tuple(key)
+
+        try:
+            group_value = self.cache.get(key)
+        except TypeError:
+            # Valori non hashable (liste, mappe): nessuna cache
+            return self.evaluate(feature)
+
+        if group_value is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return group_value
+
+        self.misses += 1
+        group_value = self.evaluate(feature)
+        self.cache[key] = group_value
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return group_value
+
+
+def geometry_from_wkb(wkb):
+    """Crea una QgsGeometry da WKB."""
+    geom = QgsGeometry()
+    geom.fromWkb(wkb)
+    return geom
+
+
+def int64_array(values):
+    """Array NumPy di indici come array('q'): 8 byte per elemento, senza liste di int Python."""
+    result = array('q')
+    result.frombytes(values.astype(np.int64).tobytes())
+    return result
+
+
+def note_token(value):
+    """Testo con cui un valore del campo entra nella concatenazione."""
+    return str(value) if value is not None else ""
+
+
+def feature_hash(feature, field_name, group_key):
+    """Hash del contenuto di una feature: geometria, valore del campo e chiave di gruppo."""
+    value = feature[field_name]
+    if isinstance(value, QVariant):
+        value = None
+    digest = hashlib.sha1(feature.geometry().asWkb().data())
+    digest.update(repr((value, group_key)).encode('utf-8'))
+    return digest.digest()
+
+
+def dissolve_worker(tasks, results, adjacency_rule, adjacency_tolerance, coverage_mode):
+    """Processo worker: clustering e union di gruppi ricevuti come WKB."""
+    algorithm = DissolveAdjacentByExpressionAlgorithm()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        task_id, split, wkbs, tokens = task
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            geometries = [geometry_from_wkb(wkb) for wkb in wkbs]
+            if split:
+                # Cluster gia calcolato dal processo principale
+                clusters = [list(range(len(geometries)))]
+            else:
+                clusters = algorithm.cluster_geometries(geometries, adjacency_rule, adjacency_tolerance)
+
+            output = []
+            for cluster in clusters:
+                dissolved = algorithm.dissolve_cluster(
+                    [geometries[i] for i in cluster], [tokens[i] for i in cluster], coverage_mode
+                )
+                if dissolved is not None:
+                    dissolved_geom, note_val, nro_val = dissolved
+                    output.append((dissolved_geom.asWkb().data(), note_val, nro_val))
+            # Tempo reale e CPU del worker per la profilazione dei gruppi grandi
+            timing = (time.perf_counter() - wall_start, time.process_time() - cpu_start)
+            results.put((task_id, output, None, timing))
+        except Exception:
+            results.put((task_id, None, traceback.format_exc(), None))
+
+
+class ParallelDissolver:
+    """Pool di processi che esegue clustering e union dei gruppi in parallelo."""
+
+    # Gruppi oltre questa dimensione sono suddivisi per cluster
+    SPLIT_GROUP_SIZE = 2000
+    POLL_INTERVAL = 0.2
+
+    @staticmethod
+    def available():
+        # Solo Linux: su macOS il fork di un processo Qt/Cocoa puo bloccare il figlio
+        return sys.platform.startswith('linux') and 'fork' in multiprocessing.get_all_start_methods()
+
+    def __init__(self, algorithm, workers, field_name, feedback,
+                 adjacency_rule=AdjacencyPredicate.TOUCHES, adjacency_tolerance=0.0,
+                 coverage_mode=False):
+        self.algorithm = algorithm
+        self.workers = workers
+        self.field_name = field_name
+        self.feedback = feedback
+        self.adjacency_rule = adjacency_rule
+        self.adjacency_tolerance = adjacency_tolerance
+        self.coverage_mode = coverage_mode
+        self.max_pending = workers * 2
+        self.processes = []
+
+    def __enter__(self):
+        # Con 'fork' la funzione worker non deve essere importabile dal figlio
+        mp_context = multiprocessing.get_context('fork')
+        self.tasks = mp_context.Queue()
+        self.results = mp_context.Queue()
+        for _ in range(self.workers):
+            process = mp_context.Process(
+                target=dissolve_worker,
+                args=(self.tasks, self.results, self.adjacency_rule, self.adjacency_tolerance,
+                      self.coverage_mode),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None and not self.feedback.isCanceled():
+            for _ in self.processes:
+                self.tasks.put(None)
+            for process in self.processes:
+                process.join()
+        else:
+            for process in self.processes:
+                process.terminate()
+                process.join()
+        return False
+
+    def group_tasks(self, group_features, clustered=False, single_fids=frozenset()):
+        """Suddivide un gruppo in task: (split, wkbs, tokens) oppure risultati locali.
+
+        Con clustered un cluster di una sola feature resta grezzo solo se la feature
+        e l'unica del suo gruppo (single_fids), come in dissolve_group.
+        """
+        if len(group_features) == 1 and (not clustered or group_features[0].id() in single_fids):
+            feature = group_features[0]
+            return [(None, [(feature.geometry(), feature[self.field_name], 1)])]
+
+        geometries = [f.geometry() for f in group_features]
+        tokens = [note_token(f[self.field_name]) for f in group_features]
+
+        if clustered:
+            # Il gruppo e gia un cluster: al worker resta solo la union
+            return [((True, [g.asWkb().data() for g in geometries], tokens), None)]
+
+        graph = self.algorithm.adjacency_graph
+        if graph is None and len(group_features) <= self.SPLIT_GROUP_SIZE:
+            return [((False, [g.asWkb().data() for g in geometries], tokens), None)]
+
+        # Gruppo grande (o grafo di adiacenza noto): clustering qui, union di ogni cluster su un worker
+        if graph is not None:
+            clusters = graph.clusters(group_features)
+        else:
+            clusters = self.algorithm.cluster_geometries(
+                geometries, self.adjacency_rule, self.adjacency_tolerance, feedback=self.feedback
+            )
+        return [
+            ((True, [geometries[i].asWkb().data() for i in cluster], [tokens[i] for i in cluster]), None)
+            for cluster in clusters
+        ]
+
+    def collect(self, results, timings):
+        """Attende il risultato di un task; False se l'utente ha annullato."""
+        while True:
+            if self.feedback.isCanceled():
+                return False
+            try:
+                task_id, output, error, timing = self.results.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                if not all(process.is_alive() for process in self.processes):
+                    raise QgsProcessingException(
+                        self.algorithm.tr('Un processo worker e terminato inaspettatamente')
+                    )
+                continue
+
+            if error is not None:
+                raise QgsProcessingException(
+                    self.algorithm.tr('Errore nel processo worker:\n{}').format(error)
+                )
+            results[task_id] = [
+                (geometry_from_wkb(wkb), note_val, nro_val) for wkb, note_val, nro_val in output
+            ]
+            timings[task_id] = timing
+            return True
+
+    def run(self, groups, clustered=False, on_group=None, single_fids=frozenset()):
+        """Dissolve i gruppi (o cluster gia calcolati) restituendo i risultati in ordine.
+
+        on_group, se indicato, riceve i risultati di ogni gruppo appena emessi per intero.
+        I gruppi grandi sono registrati nel profiler con il tempo di clustering locale
+        piu il tempo reale e CPU dei worker sui loro task.
+        """
+        profiler = self.algorithm.profiler
+        results = {}
+        timings = {}
+        # Ultimo task di ogni gruppo -> (numero di feature, tempo reale e CPU locali)
+        group_ends = {}
+        group_results = []
+        group_wall = group_cpu = 0.0
+        next_task = 0
+        next_emit = 0
+        pending = 0
+
+        def emit():
+            nonlocal next_emit, group_results, group_wall, group_cpu
+            while next_emit in results:
+                task_results = results.pop(next_emit)
+                yield from task_results
+                group_results.extend(task_results)
+                timing = timings.pop(next_emit, None)
+                if timing is not None:
+                    group_wall += timing[0]
+                    group_cpu += timing[1]
+                if next_emit in group_ends:
+                    size, local_wall, local_cpu = group_ends.pop(next_emit)
+                    if size >= StageProfiler.LARGE_GROUP_SIZE:
+                        profiler.record('Gruppo di {} feature (worker)'.format(size),
+                                        local_wall + group_wall, local_cpu + group_cpu, len(group_results))
+                    if on_group is not None:
+                        on_group(group_results)
+                    group_results = []
+                    group_wall = group_cpu = 0.0
+                next_emit += 1
+
+        for group_features in groups:
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            group_tasks = self.group_tasks(group_features, clustered, single_fids)
+            if self.feedback.isCanceled():
+                # Gruppo incompleto: non emesso ne registrato
+                return
+            group_ends_entry = (len(group_features), time.perf_counter() - wall_start,
+                                time.process_time() - cpu_start)
+            for task, local_result in group_tasks:
+                if task is None:
+                    results[next_task] = local_result
+                else:
+                    while pending >= self.max_pending:
+                        if not self.collect(results, timings):
+                            return
+                        pending -= 1
+                    self.tasks.put((next_task,) + task)
+                    pending += 1
+                next_task += 1
+            group_ends[next_task - 1] = group_ends_entry
+
+            yield from emit()
+
+        while pending:
+            if not self.collect(results, timings):
+                return
+            pending -= 1
+
+        yield from emit()
+
+
+def peak_rss_kb():
+    """Picco di memoria residente del processo in KB; None se non disponibile (Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss e in byte su macOS, in KB su Linux
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class StageProfiler:
+    """Tempo, CPU e picco di memoria delle fasi; se disattivato non misura nulla."""
+
+    # Gruppi misurati singolarmente oltre questa dimensione
+    LARGE_GROUP_SIZE = 5000
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = []
+        self.timers = {}
+        self.sinks = {}
+
+    def start(self, name):
+        """Inizio di una fase; da chiudere con stop()."""
+        if not self.enabled:
+            return None
+        return name, time.perf_counter(), time.process_time(), peak_rss_kb()
+
+    def stop(self, stage, items=None):
+        """Chiude la fase registrando tempo, CPU, aumento del picco di memoria e numero di elementi."""
+        if stage is None:
+            return
+        name, wall_start, cpu_start, rss_start = stage
+        rss = peak_rss_kb()
+        self.stages.append({
+            'name': name,
+            'wall_s': round(time.perf_counter() - wall_start, 6),
+            'cpu_s': round(time.process_time() - cpu_start, 6),
+            'peak_rss_delta_kb': rss - rss_start if rss is not None else None,
+            'items': items
+        })
+
+    def record(self, name, wall_s, cpu_s=None, items=None):
+        """Registra una fase misurata altrove (es. nei processi worker); memoria non disponibile."""
+        if self.enabled:
+            self.stages.append({
+                'name': name,
+                'wall_s': round(wall_s, 6),
+                'cpu_s': round(cpu_s, 6) if cpu_s is not None else None,
+                'peak_rss_delta_kb': None,
+                'items': items
+            })
+
+    def timer(self, name):
+        """Context manager che accumula il tempo di una sotto-fase ripetuta (union, bordi...)."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name)
+
+    @contextmanager
+    def _timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.timers.setdefault(name, [0.0, 0])
+            totals[0] += time.perf_counter() - start
+            totals[1] += 1
+
+    def record_sink(self, name, writer):
+        if self.enabled:
+            self.sinks[name] = {
+                'features': writer.count,
+                'wall_s': round(writer.elapsed, 6),
+                'features_per_s': round(writer.throughput, 1)
+            }
+
+    def metrics(self):
+        """Metriche raccolte in forma serializzabile JSON."""
+        return {
+            'stages': self.stages,
+            'timers': {name: {'wall_s': round(total, 6), 'calls': calls}
+                       for name, (total, calls) in self.timers.items()},
+            'sinks': self.sinks,
+            'peak_rss_kb': peak_rss_kb()
+        }
+
+
+class BatchedSinkWriter:
+    """Scrive su un sink a blocchi (addFeatures) partendo da una feature modello."""
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, sink, fields, batch_size=BATCH_SIZE):
+        self.sink = sink
+        self.template = QgsFeature(fields)
+        self.batch_size = max(1, batch_size)
+        self.batch = []
+        self.count = 0
+        self.elapsed = 0.0
+
+    def write(self, geometry, attributes):
+        """Accoda una feature con gli attributi nell'ordine dei campi."""
+        feature = QgsFeature(self.template)
+        feature.setGeometry(geometry)
+        feature.setAttributes(attributes)
+        self.addFeature(feature)
+
+    def addFeature(self, feature, flags=QgsFeatureSink.FastInsert):
+        """Accoda una feature gia costruita (stessa interfaccia di QgsFeatureSink)."""
+        self.batch.append(feature)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Scrive le feature accodate con una sola chiamata al sink."""
+        if not self.batch:
+            return
+        self.write_batch(self.batch)
+        self.batch = []
+
+    def write_batch(self, batch):
+        """Scrive un blocco di feature sul sink e aggiorna conteggio e tempo."""
+        start = time.perf_counter()
+        written = self.sink.addFeatures(batch, QgsFeatureSink.FastInsert)
+        self.elapsed += time.perf_counter() - start
+        if not written:
+            raise QgsProcessingException(
+                QCoreApplication.translate('Processing', 'Errore di scrittura nel layer di output')
+            )
+        self.count += len(batch)
+
+    def close(self):
+        """Scrive le feature rimaste."""
+        self.flush()
+
+    @property
+    def throughput(self):
+        return self.count / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ThreadedSinkWriter(BatchedSinkWriter):
+    """BatchedSinkWriter con le scritture sul sink eseguite da un thread consumatore."""
+
+    def __init__(self, sink, fields, batch_size=BatchedSinkWriter.BATCH_SIZE, depth=10000):
+        # Blocchi non piu grandi della profondita, cosi la profondita e un limite reale
+        super().__init__(sink, fields, min(batch_size, max(1, depth)))
+        # Profondita in feature: blocchi in attesa di scrittura
+        self.queue = queue.Queue(max(1, depth // self.batch_size))
+        self.error = None
+        self.aborted = False
+        self.thread = threading.Thread(target=self.consume, name='ThreadedSinkWriter', daemon=True)
+        self.thread.start()
+
+    def consume(self):
+        """Scrive i blocchi in coda fino al segnale di fine (None)."""
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is not None or self.aborted:
+                continue
+            try:
+                self.write_batch(batch)
+            except BaseException as e:
+                # Riportato al thread principale alla prossima flush o alla chiusura
+                self.error = e
+
+    def flush(self):
+        """Passa il blocco al thread di scrittura (attende se la coda e piena)."""
+        if self.error is not None:
+            raise self.error
+        if not self.batch:
+            return
+        self.queue.put(self.batch)
+        self.batch = []
+
+    def close(self):
+        """Scrive le feature rimaste e attende il thread di scrittura."""
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def abort(self):
+        """Ferma il thread scartando le scritture in coda (errore o annullamento)."""
+        if self.thread.is_alive():
+            self.aborted = True
+            self.queue.put(None)
+            self.thread.join()
+
+
+class FeaturePrefetcher:
+    """Legge un iterabile (feature o gruppi) in un thread produttore, attraverso una coda limitata."""
+
+    CHUNK_SIZE = 256
+    POLL_SECONDS = 0.1
+    END = object()
+
+    def __init__(self, iterable, feedback, depth, chunk_size=CHUNK_SIZE):
+        self.iterable = iterable
+        self.feedback = feedback
+        self.chunk_size = max(1, min(chunk_size, depth))
+        self.queue = queue.Queue(max(1, depth // self.chunk_size))
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.produce, name='FeaturePrefetcher', daemon=True)
+        self.thread.start()
+
+    def produce(self):
+        """Riempie la coda a blocchi; l'annullamento chiude il flusso, un errore viene inoltrato."""
+        try:
+            chunk = []
+            for item in self.iterable:
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    if not self.put(chunk):
+                        return
+                    chunk = []
+                    if self.feedback.isCanceled():
+                        break
+            if chunk and not self.put(chunk):
+                return
+            self.put(self.END)
+        except BaseException as e:
+            self.put(e)
+        finally:
+            self.iterable = None
+
+    def put(self, item):
+        """Inserisce in coda; False se il consumatore ha chiuso il flusso."""
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=self.POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is self.END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield from item
+        finally:
+            self.close()
+
+    def close(self):
+        """Ferma il produttore e libera la coda."""
+        self.stopped.set()
+        while self.thread.is_alive():
+            try:
+                self.queue.get(timeout=self.POLL_SECONDS)
+            except queue.Empty:
+                pass
+        self.thread.join()
+
+
+class IncrementalCache:
+    """Cache SQLite delle riesecuzioni: hash delle feature, cluster e risultati dissolti."""
+
+    def __init__(self, path, settings_hash):
+        self.path = path
+        self.settings_hash = settings_hash
+        self.connection = None
+        self.valid = False
+
+    def __enter__(self):
+        self.connection = sqlite3.connect(self.path)
+        cursor = self.connection.cursor()
+        cursor.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        # Cache di una versione precedente senza il flag raw: i cluster vengono ricalcolati
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(clusters)')]
+        if columns and 'raw' not in columns:
+            cursor.execute('DROP TABLE clusters')
+            cursor.execute('DROP TABLE IF EXISTS features')
+        cursor.execute('CREATE TABLE IF NOT EXISTS features '
+                       '(fid INTEGER PRIMARY KEY, hash BLOB, cluster INTEGER)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS clusters '
+                       '(cluster INTEGER PRIMARY KEY, wkb BLOB, note, nro INTEGER, raw INTEGER)')
+
+        # Parametri diversi dall'esecuzione precedente: la cache non e riutilizzabile
+        row = cursor.execute("SELECT value FROM meta WHERE key = 'settings'").fetchone()
+        self.valid = row is not None and row[0] == self.settings_hash
+        if not self.valid:
+            cursor.execute('DELETE FROM features')
+            cursor.execute('DELETE FROM clusters')
+            cursor.execute("INSERT OR REPLACE INTO meta VALUES ('settings', ?)", (self.settings_hash,))
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+        self.connection.close()
+        return False
+
+    def feature_rows(self):
+        """Dizionario fid -> (hash, cluster) dell'esecuzione precedente."""
+        return {fid: (digest, cluster) for fid, digest, cluster
+                in self.connection.execute('SELECT fid, hash, cluster FROM features')}
+
+    def cluster_results(self, cluster_ids):
+        """Cluster richiesti -> (risultato, raw): risultato (geometria, note, nro) o None se il
+        dissolve era vuoto; raw se la feature era l'unica del gruppo e fu scritta senza dissolve."""
+        results = {}
+        for cluster, wkb, note_val, nro_val, raw in self.connection.execute(
+                'SELECT cluster, wkb, note, nro, raw FROM clusters'):
+            if cluster in cluster_ids:
+                result = None if wkb is None else (geometry_from_wkb(wkb), note_val, nro_val)
+                results[cluster] = (result, bool(raw))
+        return results
+
+    def next_cluster_id(self):
+        return self.connection.execute('SELECT COALESCE(MAX(cluster), 0) + 1 FROM clusters').fetchone()[0]
+
+    @staticmethod
+    def storable(value):
+        """Valore del campo salvabile in SQLite."""
+        if isinstance(value, QVariant):
+            return None
+        if value is None or isinstance(value, (int, float, str, bytes)):
+            return value
+        return str(value)
+
+    def update(self, deleted_fids, dirty_clusters, feature_rows, cluster_results):
+        """Sostituisce le righe di feature e cluster ricalcolati."""
+        cursor = self.connection.cursor()
+        cursor.executemany('DELETE FROM features WHERE fid = ?', ((fid,) for fid in deleted_fids))
+        cursor.executemany('DELETE FROM clusters WHERE cluster = ?', ((c,) for c in dirty_clusters))
+        cursor.executemany('INSERT OR REPLACE INTO features VALUES (?, ?, ?)', feature_rows)
+        cursor.executemany('INSERT INTO clusters VALUES (?, ?, ?, ?, ?)', (
+            (cluster, None, None, None, raw) if result is None else
+            (cluster, result[0].asWkb().data(), self.storable(result[1]), result[2], raw)
+            for cluster, result, raw in cluster_results
+        ))
+
+
+class Checkpoint:
+    """Checkpoint SQLite delle esecuzioni lunghe: manifest dei parametri, gruppi dissolti e segmenti unici."""
+
+    DISSOLVE = 'dissolve'
+    SEGMENTS = 'segments'
+
+    # Intervallo minimo tra due commit dei gruppi completati
+    COMMIT_SECONDS = 5.0
+
+    def __init__(self, path, manifest, resume=False):
+        self.path = path
+        self.manifest = json.dumps(manifest, sort_keys=True, default=str)
+        self.resume = resume
+        self.connection = None
+        self.valid = False
+        self.groups_done = 0
+        self.last_commit = 0.0
+
+    def __enter__(self):
+        self.connection = sqlite3.connect(self.path)
+        cursor = self.connection.cursor()
+        cursor.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS dissolved (seq INTEGER PRIMARY KEY, wkb BLOB, note, nro INTEGER)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS arrays (name TEXT PRIMARY KEY, typecode TEXT, data BLOB)')
+
+        # Si riprende solo con gli stessi parametri e lo stesso layer
+        row = cursor.execute("SELECT value FROM meta WHERE key = 'manifest'").fetchone()
+        self.valid = self.resume and row is not None and row[0] == self.manifest
+        if self.valid:
+            row = cursor.execute("SELECT value FROM meta WHERE key = 'groups_done'").fetchone()
+            self.groups_done = int(row[0]) if row is not None else 0
+        else:
+            cursor.execute('DELETE FROM meta')
+            cursor.execute('DELETE FROM dissolved')
+            cursor.execute('DELETE FROM arrays')
+            cursor.execute("INSERT INTO meta VALUES ('manifest', ?)", (self.manifest,))
+            cursor.execute("INSERT INTO meta VALUES ('groups_done', '0')")
+        self.connection.commit()
+        self.last_commit = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        # Anche dopo un errore le righe scritte sono di gruppi completi
+        self.connection.commit()
+        self.connection.close()
+        return False
+
+    def stage_done(self, stage):
+        return self.connection.execute(
+            'SELECT 1 FROM meta WHERE key = ?', ('stage:' + stage,)).fetchone() is not None
+
+    def finish_stage(self, stage):
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES (?, 'done')", ('stage:' + stage,))
+        self.connection.commit()
+
+    def dissolved_results(self):
+        """Risultati (geometria, note, nro) dei gruppi completati, nell'ordine di scrittura."""
+        for wkb, note_val, nro_val in self.connection.execute('SELECT wkb, note, nro FROM dissolved ORDER BY seq'):
+            yield geometry_from_wkb(wkb), note_val, nro_val
+
+    def add_group(self, dissolved_results):
+        """Registra i risultati di un gruppo completato (commit al piu ogni COMMIT_SECONDS)."""
+        cursor = self.connection.cursor()
+        cursor.executemany('INSERT INTO dissolved (wkb, note, nro) VALUES (?, ?, ?)', (
+            (geom.asWkb().data(), IncrementalCache.storable(note_val), nro_val)
+            for geom, note_val, nro_val in dissolved_results
+        ))
+        self.groups_done += 1
+        cursor.execute("UPDATE meta SET value = ? WHERE key = 'groups_done'", (str(self.groups_done),))
+        if time.perf_counter() - self.last_commit >= self.COMMIT_SECONDS:
+            self.connection.commit()
+            self.last_commit = time.perf_counter()
+
+    def segments(self):
+        """Segmenti unici salvati dallo STEP 6 (non usato in modalita topologica)."""
+        arrays = {}
+        for name, typecode, data in self.connection.execute('SELECT name, typecode, data FROM arrays'):
+            values = array(typecode)
+            values.frombytes(data)
+            arrays[name] = values
+        return arrays.get('unique_segments')
+
+    def save_segments(self, unique_segments):
+        """Salva il risultato dello STEP 6 e segna la fase come completata."""
+        rows = [('unique_segments', 'q', self.int64_bytes(unique_segments))]
+        self.connection.executemany('INSERT OR REPLACE INTO arrays VALUES (?, ?, ?)', rows)
+        self.finish_stage(self.SEGMENTS)
+
+    @staticmethod
+    def int64_bytes(values):
+        """Byte degli indici come int64 (gli array('q') sono salvati senza copia in lista)."""
+        if isinstance(values, array) and values.typecode == 'q':
+            return values.tobytes()
+        return array('q', values).tobytes()
+
+
+class AdjacencyGraph:
+    """Grafo di adiacenza dei poligoni: archi (fid_a, fid_b, lunghezza del bordo condiviso)."""
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.neighbours = {}
+        for fid_a, fid_b, _ in edges:
+            self.neighbours.setdefault(fid_a, []).append(fid_b)
+            self.neighbours.setdefault(fid_b, []).append(fid_a)
+
+    def __len__(self):
+        return len(self.edges)
+
+    @staticmethod
+    def input_key(features, adjacency_rule, adjacency_tolerance):
+        """Hash di fid e geometrie delle feature e della regola di adiacenza."""
+        digest = hashlib.sha1(repr((adjacency_rule, adjacency_tolerance)).encode('utf-8'))
+        for feature in features:
+            digest.update(str(feature.id()).encode('ascii'))
+            digest.update(feature.geometry().asWkb().data())
+        return digest.hexdigest()
+
+    def clusters(self, group_features):
+        """Cluster del gruppo dagli archi del grafo, nello stesso ordine di cluster_geometries."""
+        local_of = {feature.id(): i for i, feature in enumerate(group_features)}
+        uf = UnionFind(len(group_features))
+        for i, feature in enumerate(group_features):
+            for fid in self.neighbours.get(feature.id(), ()):
+                j = local_of.get(fid)
+                if j is not None and j > i:
+                    uf.union(i, j)
+
+        clusters = {}
+        for i in range(len(group_features)):
+            clusters.setdefault(uf.find(i), []).append(i)
+        return list(clusters.values())
+
+    @classmethod
+    def load(cls, path, key):
+        """Grafo salvato in path per la stessa chiave; None se assente o diverso."""
+        with closing(sqlite3.connect(path)) as connection:
+            cls.create_tables(connection)
+            row = connection.execute("SELECT value FROM meta WHERE key = 'input_key'").fetchone()
+            if row is None or row[0] != key:
+                return None
+            return cls(connection.execute('SELECT fid_a, fid_b, shared_length FROM edges').fetchall())
+
+    def save(self, path, key):
+        """Sostituisce il grafo salvato in path."""
+        with closing(sqlite3.connect(path)) as connection:
+            with connection:
+                self.create_tables(connection)
+                connection.execute('DELETE FROM edges')
+                connection.executemany('INSERT INTO edges VALUES (?, ?, ?)', self.edges)
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('input_key', ?)", (key,))
+
+    @staticmethod
+    def create_tables(connection):
+        connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        connection.execute('CREATE TABLE IF NOT EXISTS edges (fid_a INTEGER, fid_b INTEGER, shared_length REAL)')
+
+
+class TileGrid:
+    """Griglia regolare di tasselli quadrati sull'estensione del layer."""
+
+    def __init__(self, extent, tile_size):
+        self.x_min = extent.xMinimum()
+        self.y_min = extent.yMinimum()
+        self.tile_size = tile_size
+        self.columns = max(1, math.ceil(extent.width() / tile_size))
+        self.rows = max(1, math.ceil(extent.height() / tile_size))
+
+    def __len__(self):
+        return self.columns * self.rows
+
+    def rectangle(self, index):
+        """Rettangolo del tassello index (ordine per righe)."""
+        column, row = index % self.columns, index // self.columns
+        x = self.x_min + column * self.tile_size
+        y = self.y_min + row * self.tile_size
+        return QgsRectangle(x, y, self.x_min + (column + 1) * self.tile_size,
+                            self.y_min + (row + 1) * self.tile_size)
+
+    def tile_of(self, box):
+        """Tassello proprietario di un bounding box: quello che ne contiene il centro."""
+        center = box.center()
+        column = int((center.x() - self.x_min) // self.tile_size)
+        row = int((center.y() - self.y_min) // self.tile_size)
+        column = min(max(column, 0), self.columns - 1)
+        row = min(max(row, 0), self.rows - 1)
+        return row * self.columns + column
+
+    def is_interior(self, box, index, margin=0.0):
+        """True se il box, espanso di margin, e strettamente interno al tassello."""
+        rect = self.rectangle(index)
+        return (box.xMinimum() - margin > rect.xMinimum() and box.xMaximum() + margin < rect.xMaximum()
+                and box.yMinimum() - margin > rect.yMinimum() and box.yMaximum() + margin < rect.yMaximum())
+
+
+class PolygonTable:
+    """Poligoni dissolti numerati per indice (owner): id di output, attributi e flag eccezione."""
+
+    def __init__(self, exception_matcher=None):
+        # Per poligono: id di output, indice nella tabella attributi e
+        # flag eccezione (calcolato una volta sola per poligono)
+        self.polygon_ids = array('i')
+        self.polygon_attributes = array('i')
+        self.exception_flags = array('b')
+        self.exception_matcher = exception_matcher
+
+        # Tabella interna dei valori (note, nro) distinti
+        self.attributes = []
+        self._attribute_index = {}
+
+    def intern_attributes(self, note_val, nro_val):
+        """Indice della coppia (note, nro) nella tabella attributi."""
+        key = (note_val, nro_val)
+        try:
+            index = self._attribute_index.get(key)
+        except TypeError:
+            key = None
+            index = None
+
+        if index is None:
+            index = len(self.attributes)
+            self.attributes.append((note_val, nro_val))
+            if key is not None:
+                self._attribute_index[key] = index
+        return index
+
+    def add_owner(self, note_val, nro_val, id_val):
+        """Registra un poligono e ne restituisce l'indice."""
+        owner = len(self.polygon_ids)
+        self.polygon_ids.append(id_val)
+        self.polygon_attributes.append(self.intern_attributes(note_val, nro_val))
+        self.exception_flags.append(self.has_exception_value(note_val))
+        return owner
+
+    @staticmethod
+    def boundary_vertices(poly_geom):
+        """Coordinate (xs, ys) di ogni linea del bordo; None se il bordo e vuoto."""
+        geom_const = poly_geom.constGet()
+        if not geom_const:
+            return None
+
+        if isinstance(geom_const, QgsCurvePolygon):
+            exterior = geom_const.exteriorRing()
+            if exterior is None:
+                return None
+            rings = [exterior]
+            rings.extend(geom_const.interiorRing(i) for i in range(geom_const.numInteriorRings()))
+
+            lines = []
+            for ring in rings:
+                if not isinstance(ring, QgsLineString):
+                    ring = ring.curveToLine()
+                lines.append((ring.xVector(), ring.yVector()))
+            return lines
+
+        # Geometrie non poligonali: stesso risultato di boundary()
+        boundary = geom_const.boundary()
+        if not boundary:
+            return None
+        line_geom = QgsGeometry(boundary)
+        parts = line_geom.asMultiPolyline() if line_geom.isMultipart() else [line_geom.asPolyline()]
+        return [([p.x() for p in part], [p.y() for p in part]) for part in parts]
+
+    def has_exception_value(self, note_val):
+        """Verifica se il valore contiene uno dei valori di eccezione."""
+        if self.exception_matcher is None:
+            return False
+        note_upper = str(note_val).upper() if note_val else ""
+        return self.exception_matcher.search(note_upper) is not None
+
+    def polygon_attributes_of(self, owner):
+        """Restituisce (note, nro, id) del poligono proprietario."""
+        note_val, nro_val = self.attributes[self.polygon_attributes[owner]]
+        return note_val, nro_val, self.polygon_ids[owner]
+
+
+class SegmentStore(PolygonTable):
+    """Segmenti dei bordi in array contigui: coordinate float64, poligono proprietario int32."""
+
+    def __init__(self, exception_matcher=None):
+        super().__init__(exception_matcher)
+        self.x1 = array('d')
+        self.y1 = array('d')
+        self.x2 = array('d')
+        self.y2 = array('d')
+        self.owner = array('i')
+
+        # Per anello: indice del primo segmento e flag anello esterno
+        self.ring_offsets = array('q')
+        self.ring_exterior = array('b')
+
+    def __len__(self):
+        return len(self.x1)
+
+    def add_polygon(self, poly_geom, note_val, nro_val, id_val):
+        """Aggiunge i segmenti del bordo di un poligono; False se non ha bordo."""
+        owner = self.add_owner(note_val, nro_val, id_val)
+
+        lines = self.boundary_vertices(poly_geom)
+        for ring_index, (xs, ys) in enumerate(lines or ()):
+            count = len(xs) - 1
+            if count < 1:
+                continue
+            self.ring_offsets.append(len(self.x1))
+            self.ring_exterior.append(ring_index == 0)
+            self.x1.extend(xs[:-1])
+            self.y1.extend(ys[:-1])
+            self.x2.extend(xs[1:])
+            self.y2.extend(ys[1:])
+            self.owner.extend(repeat(owner, count))
+        return lines is not None
+
+    def segment_exception(self, i):
+        """Flag eccezione del segmento i (quello del poligono proprietario)."""
+        return self.exception_flags[self.owner[i]]
+
+    def segment_attributes(self, i):
+        """Restituisce (note, nro, id) del segmento i."""
+        return self.polygon_attributes_of(self.owner[i])
+
+    def segment_coordinates(self, i):
+        return [(self.x1[i], self.y1[i]), (self.x2[i], self.y2[i])]
+
+    def segment_points(self, i):
+        return [QgsPointXY(self.x1[i], self.y1[i]), QgsPointXY(self.x2[i], self.y2[i])]
+
+    def segment_geometry(self, i):
+        """Costruisce la QgsGeometry del segmento i (solo in scrittura)."""
+        return QgsGeometry.fromPolylineXY(self.segment_points(i))
+
+
+class RingStore(PolygonTable):
+    """Anelli dei bordi come vertici contigui (modalita topologica): nessun segmento a due punti.
+
+    Lo spigolo k dell'anello r unisce i vertici offsets[r] + k e offsets[r] + k + 1; gli
+    spigoli sono numerati in ordine di anello, quindi il primo vertice dello spigolo e
+    vale indice_spigolo + r.
+    """
+
+    def __init__(self, exception_matcher=None):
+        super().__init__(exception_matcher)
+        self.x = array('d')
+        self.y = array('d')
+
+        # Per anello: indice del primo vertice, poligono proprietario e flag anello esterno
+        self.ring_offsets = array('q')
+        self.ring_owner = array('i')
+        self.ring_exterior = array('b')
+
+    def __len__(self):
+        """Numero di spigoli degli anelli."""
+        return len(self.x) - len(self.ring_offsets)
+
+    def ring_vertices(self, r):
+        """Intervallo [start, end) dei vertici dell'anello r."""
+        start = self.ring_offsets[r]
+        end = self.ring_offsets[r + 1] if r + 1 < len(self.ring_offsets) else len(self.x)
+        return start, end
+
+    def add_polygon(self, poly_geom, note_val, nro_val, id_val):
+        """Aggiunge i vertici degli anelli del bordo di un poligono; False se non ha bordo."""
+        owner = self.add_owner(note_val, nro_val, id_val)
+
+        lines = self.boundary_vertices(poly_geom)
+        for ring_index, (xs, ys) in enumerate(lines or ()):
+            if len(xs) < 2:
+                continue
+            self.ring_offsets.append(len(self.x))
+            self.ring_owner.append(owner)
+            self.ring_exterior.append(ring_index == 0)
+            self.x.extend(xs)
+            self.y.extend(ys)
+        return lines is not None
+
+
+class LineChainer:
+    """Unisce linee con estremi coincidenti in polilinee, come GEOS LineMerger (mergeLines)."""
+
+    def __init__(self):
+        self.lines = []
+        self.star = {}
+
+    def add_line(self, coords):
+        """Aggiunge una linea [(x, y), ...]; le linee di lunghezza nulla sono ignorate."""
+        points = [coords[0]]
+        for point in coords[1:]:
+            if point != points[-1]:
+                points.append(point)
+        if len(points) < 2:
+            return
+
+        line_index = len(self.lines)
+        self.lines.append(points)
+        self.star.setdefault(points[0], []).append((line_index, True))
+        self.star.setdefault(points[-1], []).append((line_index, False))
+
+    def end_node(self, edge):
+        line_index, forward = edge
+        return self.lines[line_index][-1 if forward else 0]
+
+    def angle(self, edge):
+        """Angolo di uscita dell'arco orientato dal suo nodo iniziale."""
+        points = self.lines[edge[0]]
+        (x0, y0), (x1, y1) = (points[0], points[1]) if edge[1] else (points[-1], points[-2])
+        return math.atan2(y1 - y0, x1 - x0) % (2 * math.pi)
+
+    def sorted_star(self, node):
+        return sorted(self.star[node], key=self.angle)
+
+    def next_edge(self, edge):
+        """Arco successivo attraverso un nodo di grado 2, None altrimenti."""
+        out_edges = self.star[self.end_node(edge)]
+        if len(out_edges) != 2:
+            return None
+        sym = (edge[0], not edge[1])
+        return out_edges[1] if out_edges[0] == sym else out_edges[0]
+
+    def chains(self):
+        """Restituisce le polilinee unite, nello stesso ordine di GEOS."""
+        marked = [False] * len(self.lines)
+        chains = []
+
+        def build_from(node):
+            for start in self.sorted_star(node):
+                if marked[start[0]]:
+                    continue
+                edges = []
+                current = start
+                while current is not None:
+                    edges.append(current)
+                    marked[current[0]] = True
+                    current = self.next_edge(current)
+                    if current == start:
+                        break
+                chains.append(self.chain_coordinates(edges))
+
+        # Prima le catene che partono da nodi di grado diverso da 2,
+        # poi gli anelli isolati (solo nodi di grado 2)
+        nodes = sorted(self.star)
+        for node in nodes:
+            if len(self.star[node]) != 2:
+                build_from(node)
+        for node in nodes:
+            if len(self.star[node]) == 2:
+                build_from(node)
+
+        return chains
+
+    def chain_coordinates(self, edges):
+        """Coordinate della catena, orientata come la maggioranza delle linee originali."""
+        coords = []
+        forward_count = 0
+        for line_index, forward in edges:
+            points = self.lines[line_index]
+            if forward:
+                forward_count += 1
+            else:
+                points = points[::-1]
+            coords.extend(points[1:] if coords and coords[-1] == points[0] else points)
+
+        if len(edges) - forward_count > forward_count:
+            coords.reverse()
+        return coords
+
+
 class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
     """
     Dissolve poligoni adiacenti basandosi su un'espressione applicata
@@ -69,10 +1338,35 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
     FILTER_PREFIXES = 'FILTER_PREFIXES'
     USE_DUPLICATE_EXCEPTION = 'USE_DUPLICATE_EXCEPTION'
     EXCEPTION_VALUES = 'EXCEPTION_VALUES'
+    ADJACENCY_RULE = 'ADJACENCY_RULE'
+    ADJACENCY_TOLERANCE = 'ADJACENCY_TOLERANCE'
+    STREAMING = 'STREAMING'
+    WORKERS = 'WORKERS'
+    COVERAGE_MODE = 'COVERAGE_MODE'
+    DEDUP_TOLERANCE = 'DEDUP_TOLERANCE'
+    TOPOLOGY_MODE = 'TOPOLOGY_MODE'
+    TILE_SIZE = 'TILE_SIZE'
+    INCREMENTAL_CACHE = 'INCREMENTAL_CACHE'
+    BATCH_SIZE = 'BATCH_SIZE'
+    PIPELINE_DEPTH = 'PIPELINE_DEPTH'
+    CHECKPOINT = 'CHECKPOINT'
+    RESUME = 'RESUME'
+    ADJACENCY_GRAPH = 'ADJACENCY_GRAPH'
+    PROFILE = 'PROFILE'
+    OUTPUT_METRICS = 'OUTPUT_METRICS'
+    PROFILE_DUMP = 'PROFILE_DUMP'
+    METRICS = 'METRICS'
     OUTPUT_FILTERED = 'OUTPUT_FILTERED'
     OUTPUT = 'OUTPUT'
     OUTPUT_LINES = 'OUTPUT_LINES'
     OUTPUT_LINES_DISSOLVED = 'OUTPUT_LINES_DISSOLVED'
+    OUTPUT_ADJACENCY = 'OUTPUT_ADJACENCY'
+
+
+    # Profiler dell'esecuzione corrente (disattivato fuori da processAlgorithm)
+    profiler = StageProfiler()
+    queue_depth = 0
+    adjacency_graph = None
 
     def tr(self, string):
         return QCoreApplication.translate('Processing', string)
@@ -114,6 +1408,20 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
         <em>Nota: Se selezioni un campo diverso da "note", l'espressione verra aggiornata automaticamente</em></li>
         <li><strong>Exception values:</strong> Valori per cui gestire duplicati in modo speciale (separati da virgola)</li>
         <li><strong>Keep duplicates for specific values:</strong> Attiva eccezioni per duplicati (opzionale)</li>
+        <li><strong>Duplicate tolerance:</strong> Passo della griglia su cui vengono agganciate le coordinate per riconoscere i segmenti duplicati (default 0.000001)</li>
+        <li><strong>Adjacency rule:</strong> Regola di adiacenza: touches (default), intersects, bordo condiviso di lunghezza &gt; 0, distanza entro la tolleranza</li>
+        <li><strong>Adjacency tolerance:</strong> Distanza massima per la regola "distanza entro la tolleranza" (unita del layer)</li>
+        <li><strong>Coverage mode:</strong> Per coperture senza sovrapposizioni: dissolve con coverage union (rimuove i bordi condivisi senza overlay), con ritorno a unaryUnion se vengono rilevate sovrapposizioni</li>
+        <li><strong>Parallel workers:</strong> Numero di processi per clustering e union dei gruppi (1 = nessun parallelismo; solo Linux)</li>
+        <li><strong>Streaming ingestion:</strong> Legge prima solo fid e attributi usati dall'espressione, poi carica le geometrie un gruppo alla volta (memoria limitata dal gruppo piu grande)</li>
+        <li><strong>Tile size:</strong> Se maggiore di zero, l'estensione viene divisa in tasselli di questo lato (unita del layer) elaborati uno alla volta; i cluster sul bordo dei tasselli vengono ricuciti alla fine (0 = disattivato)</li>
+        <li><strong>Shared-edge arcs:</strong> Le linee vengono scritte come archi (tratti massimali di bordo con gli stessi poligoni a sinistra e a destra) con i campi aggiuntivi left_id e right_id. Gli archi sono costruiti direttamente dai vertici degli anelli con una mappa degli spigoli condivisi, senza creare e deduplicare i singoli segmenti</li>
+        <li><strong>Sink write batch size:</strong> Numero di feature scritte con una sola chiamata addFeatures (default 1000; con la pipeline al massimo la profondita della coda)</li>
+        <li><strong>Pipelined I/O queue depth:</strong> Se maggiore di zero, la scrittura sui sink avviene in un thread separato, con coda limitata a questo numero di feature, sovrapposta al dissolve e all'estrazione dei segmenti. La lettura e sovrapposta solo in streaming (primo passaggio e gruppo successivo) e a tasselli (tassello successivo); senza streaming ne tasselli il layer e letto per intero prima del dissolve</li>
+        <li><strong>Checkpoint file / Resume from checkpoint:</strong> File SQLite in cui vengono salvati i gruppi dissolti e i segmenti unici con il manifest dei parametri; con Resume un'esecuzione interrotta riparte saltando le fasi e i gruppi gia completati</li>
+        <li><strong>Adjacency graph cache:</strong> File SQLite con il grafo di adiacenza dei poligoni; se le geometrie in input e la regola di adiacenza non sono cambiate il grafo viene riletto e il clustering non esegue test geometrici</li>
+        <li><strong>Per-stage profiling:</strong> Riporta per ogni STEP tempo, CPU, aumento del picco di memoria e numero di elementi (e per i gruppi molto grandi); con <strong>Metrics JSON file</strong> le metriche sono salvate anche in JSON. <strong>cProfile dump</strong> salva il profilo Python dell'intera esecuzione</li>
+        <li><strong>Incremental cache:</strong> File SQLite con hash delle feature e poligoni dissolti per cluster: alla riesecuzione vengono ricalcolati solo i cluster con feature modificate o vicine a una modifica (opzionale)</li>
         </ul>
         
         <h4>Logica Eccezioni Duplicati</h4>
@@ -130,6 +1438,7 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
         <li><strong>Dissolved polygons:</strong> Poligoni dissolti single-part con campi: campo selezionato, nro, id</li>
         <li><strong>Lines without duplicates:</strong> Segmenti dai bordi senza duplicati geometrici</li>
         <li><strong>Lines dissolved by attributes:</strong> Segmenti dissolti per (campo, nro, id)</li>
+        <li><strong>Adjacency graph</strong> (opzionale): Tabella delle coppie di poligoni adiacenti (fid_a, fid_b, shared_length)</li>
         </ol>
         <hr>
         <p><strong>Autore:</strong> Salvatore Fiandaca - 2025 | <strong>Versione:</strong> v1.0</p>
@@ -204,6 +1513,186 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        # Griglia di aggancio per i segmenti duplicati
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.DEDUP_TOLERANCE,
+                self.tr('Duplicate segment tolerance (grid size)'),
+                type=QgsProcessingParameterNumber.Double,
+                minValue=0.0,
+                defaultValue=0.000001
+            )
+        )
+
+        # Regola di adiacenza
+        self.addParameter(
+            QgsProcessingParameterEnum(
+                self.ADJACENCY_RULE,
+                self.tr('Adjacency rule'),
+                options=[
+                    self.tr('Touches'),
+                    self.tr('Intersects'),
+                    self.tr('Shared boundary length > 0'),
+                    self.tr('Distance within tolerance')
+                ],
+                defaultValue=AdjacencyPredicate.TOUCHES
+            )
+        )
+
+        # Tolleranza per la regola basata sulla distanza
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.ADJACENCY_TOLERANCE,
+                self.tr('Adjacency tolerance'),
+                type=QgsProcessingParameterNumber.Double,
+                minValue=0.0,
+                defaultValue=0.0
+            )
+        )
+
+        # Dissolve ottimizzato per coperture senza sovrapposizioni
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.COVERAGE_MODE,
+                self.tr('Coverage mode (input polygons do not overlap)'),
+                defaultValue=False
+            )
+        )
+
+        # Numero di processi per il dissolve parallelo
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.WORKERS,
+                self.tr('Parallel workers'),
+                type=QgsProcessingParameterNumber.Integer,
+                minValue=1,
+                defaultValue=1
+            )
+        )
+
+        # Lettura in streaming (memoria limitata al gruppo piu grande)
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.STREAMING,
+                self.tr('Streaming ingestion (memory-bounded)'),
+                defaultValue=False
+            )
+        )
+
+        # Elaborazione a tasselli (memoria limitata dal tassello)
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.TILE_SIZE,
+                self.tr('Tile size for tiled processing (0 = disabled)'),
+                type=QgsProcessingParameterNumber.Double,
+                minValue=0.0,
+                defaultValue=0.0
+            )
+        )
+
+        # Archi condivisi ricavati dai segmenti senza duplicati (post-elaborazione)
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.TOPOLOGY_MODE,
+                self.tr('Shared-edge arcs with left_id/right_id (built from polygon rings, no segment dedup)'),
+                defaultValue=False
+            )
+        )
+
+        # Dimensione dei blocchi di scrittura sui sink
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.BATCH_SIZE,
+                self.tr('Sink write batch size'),
+                type=QgsProcessingParameterNumber.Integer,
+                minValue=1,
+                defaultValue=BatchedSinkWriter.BATCH_SIZE
+            )
+        )
+
+        # Lettura e scrittura in thread separati
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PIPELINE_DEPTH,
+                self.tr('Pipelined I/O queue depth (features, 0 = disabled)'),
+                type=QgsProcessingParameterNumber.Integer,
+                minValue=0,
+                defaultValue=0
+            )
+        )
+
+        # Cache per le riesecuzioni incrementali
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.INCREMENTAL_CACHE,
+                self.tr('Incremental cache (SQLite sidecar)'),
+                fileFilter='SQLite (*.sqlite)',
+                optional=True,
+                createByDefault=False
+            )
+        )
+
+        # Checkpoint per riprendere le esecuzioni interrotte
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.CHECKPOINT,
+                self.tr('Checkpoint file (SQLite)'),
+                fileFilter='SQLite (*.sqlite)',
+                optional=True,
+                createByDefault=False
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.RESUME,
+                self.tr('Resume from checkpoint'),
+                defaultValue=False
+            )
+        )
+
+        # Grafo di adiacenza riutilizzabile tra esecuzioni sullo stesso layer
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.ADJACENCY_GRAPH,
+                self.tr('Adjacency graph cache (SQLite)'),
+                fileFilter='SQLite (*.sqlite)',
+                optional=True,
+                createByDefault=False
+            )
+        )
+
+        # Profilazione per fase
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.PROFILE,
+                self.tr('Per-stage profiling (wall time, CPU, memory)'),
+                defaultValue=False
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.OUTPUT_METRICS,
+                self.tr('Metrics JSON file'),
+                fileFilter='JSON (*.json)',
+                optional=True,
+                createByDefault=False
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.PROFILE_DUMP,
+                self.tr('cProfile dump'),
+                fileFilter='Python profile (*.prof)',
+                optional=True,
+                createByDefault=False
+            )
+        )
+
+        self.addOutput(QgsProcessingOutputString(self.METRICS, self.tr('Metrics (JSON)')))
+
         # Output filtrato
         self.addParameter(
             QgsProcessingParameterFeatureSink(
@@ -237,7 +1726,40 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        # Grafo di adiacenza (tabella senza geometria)
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT_ADJACENCY,
+                self.tr('Adjacency graph'),
+                type=QgsProcessing.TypeVector,
+                optional=True,
+                createByDefault=False
+            )
+        )
+
     def processAlgorithm(self, parameters, context, feedback):
+        # Thread di lettura e scrittura fermati e checkpoint chiuso anche in caso di errore
+        self.exit_stack = ExitStack()
+        profile_path = self.parameterAsFileOutput(parameters, self.PROFILE_DUMP, context)
+        if not profile_path:
+            with self.exit_stack:
+                return self.run_algorithm(parameters, context, feedback)
+
+        # Profilo cProfile dell'intera esecuzione, salvato anche in caso di errore
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            with self.exit_stack:
+                result = self.run_algorithm(parameters, context, feedback)
+        finally:
+            profile.disable()
+            profile.dump_stats(profile_path)
+            feedback.pushInfo(self.tr('Profilo cProfile salvato in {}').format(profile_path))
+        result[self.PROFILE_DUMP] = profile_path
+        return result
+
+    def run_algorithm(self, parameters, context, feedback):
+        """Corpo dell'algoritmo (processAlgorithm aggiunge solo l'eventuale cProfile)."""
         # Ottieni parametri
         source = self.parameterAsSource(parameters, self.INPUT, context)
         if source is None:
@@ -260,6 +1782,40 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
         filter_prefixes_text = self.parameterAsString(parameters, self.FILTER_PREFIXES, context)
         use_duplicate_exception = self.parameterAsBoolean(parameters, self.USE_DUPLICATE_EXCEPTION, context)
         exception_values_text = self.parameterAsString(parameters, self.EXCEPTION_VALUES, context)
+        dedup_tolerance = self.parameterAsDouble(parameters, self.DEDUP_TOLERANCE, context)
+        if dedup_tolerance <= 0:
+            raise QgsProcessingException(self.tr('La tolleranza dei duplicati deve essere maggiore di zero'))
+        adjacency_rule = self.parameterAsEnum(parameters, self.ADJACENCY_RULE, context)
+        adjacency_tolerance = self.parameterAsDouble(parameters, self.ADJACENCY_TOLERANCE, context)
+        streaming = self.parameterAsBoolean(parameters, self.STREAMING, context)
+        topology_mode = self.parameterAsBoolean(parameters, self.TOPOLOGY_MODE, context)
+        tile_size = self.parameterAsDouble(parameters, self.TILE_SIZE, context)
+        cache_path = self.parameterAsFileOutput(parameters, self.INCREMENTAL_CACHE, context)
+        batch_size = self.parameterAsInt(parameters, self.BATCH_SIZE, context)
+        self.queue_depth = self.parameterAsInt(parameters, self.PIPELINE_DEPTH, context)
+        metrics_path = self.parameterAsFileOutput(parameters, self.OUTPUT_METRICS, context)
+        self.profiler = StageProfiler(
+            self.parameterAsBoolean(parameters, self.PROFILE, context) or bool(metrics_path)
+        )
+        if cache_path and (tile_size > 0 or streaming):
+            feedback.pushWarning(self.tr('La cache incrementale richiede la lettura completa del layer: tasselli e streaming ignorati'))
+            tile_size = 0.0
+            streaming = False
+        graph_path = self.parameterAsFileOutput(parameters, self.ADJACENCY_GRAPH, context)
+        self.adjacency_graph = None
+        checkpoint_path = self.parameterAsFileOutput(parameters, self.CHECKPOINT, context)
+        resume = self.parameterAsBoolean(parameters, self.RESUME, context)
+        if checkpoint_path and (tile_size > 0 or cache_path):
+            feedback.pushWarning(self.tr('Il checkpoint non e disponibile con tasselli o cache incrementale: checkpoint ignorato'))
+            checkpoint_path = None
+        coverage_mode = self.parameterAsBoolean(parameters, self.COVERAGE_MODE, context)
+        if coverage_mode and not hasattr(QgsGeometry, 'unionCoverage'):
+            feedback.pushWarning(self.tr('Coverage union non disponibile in questa versione di QGIS: uso unaryUnion'))
+            coverage_mode = False
+        workers = self.parameterAsInt(parameters, self.WORKERS, context)
+        if workers > 1 and not ParallelDissolver.available():
+            feedback.pushWarning(self.tr('Esecuzione parallela non disponibile su questa piattaforma: uso un solo processo'))
+            workers = 1
         
         exception_values = []
         if use_duplicate_exception and exception_values_text:
@@ -279,6 +1835,12 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
         fields.append(QgsField('nro', QVariant.Int))
         fields.append(QgsField('id', QVariant.Int))
 
+        # In modalita topologica le linee riportano i poligoni a sinistra e a destra
+        line_fields = QgsFields(fields)
+        if topology_mode:
+            line_fields.append(QgsField('left_id', QVariant.Int))
+            line_fields.append(QgsField('right_id', QVariant.Int))
+
         # Crea sinks
         (sink_poly, dest_id_poly) = self.parameterAsSink(
             parameters, self.OUTPUT, context, fields,
@@ -286,7 +1848,7 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
         )
 
         (sink_lines, dest_id_lines) = self.parameterAsSink(
-            parameters, self.OUTPUT_LINES, context, fields,
+            parameters, self.OUTPUT_LINES, context, line_fields,
             QgsWkbTypes.LineString, source.sourceCrs()
         )
 
@@ -295,10 +1857,40 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
             QgsWkbTypes.MultiLineString, source.sourceCrs()
         )
 
+        adjacency_fields = QgsFields()
+        adjacency_fields.append(QgsField('fid_a', QVariant.LongLong))
+        adjacency_fields.append(QgsField('fid_b', QVariant.LongLong))
+        adjacency_fields.append(QgsField('shared_length', QVariant.Double))
+        (sink_adjacency, dest_id_adjacency) = self.parameterAsSink(
+            parameters, self.OUTPUT_ADJACENCY, context, adjacency_fields,
+            QgsWkbTypes.NoGeometry, source.sourceCrs()
+        )
+        if (sink_adjacency or graph_path) and (tile_size > 0 or streaming or cache_path):
+            feedback.pushWarning(self.tr('Il grafo di adiacenza richiede la lettura completa del layer: grafo non calcolato'))
+            graph_path = None
+            sink_adjacency = None
+
+        # Scrittura a blocchi con attributi per indice: (field_name, nro, id[, left_id, right_id])
+        poly_writer = self.create_writer(sink_poly, fields, batch_size)
+        lines_writer = self.create_writer(sink_lines, line_fields, batch_size)
+        lines_dissolved_writer = self.create_writer(sink_lines_dissolved, fields, batch_size)
+        if self.queue_depth > 0:
+            feedback.pushInfo(self.tr('Scrittura in thread separato (coda di {} feature), lettura anticipata in streaming e a tasselli').format(
+                self.queue_depth))
+
+        # Contesto espressioni del layer sorgente
+        expression_context = self.createExpressionContext(parameters, context, source)
+        expression_context.setFields(source.fields())
+
         # STEP 1: Filtra features (opzionale)
-        features = list(source.getFeatures())
+        # Con letture pigre (tasselli, secondo passaggio in streaming) la lettura delle
+        # geometrie e il dissolve ricadono nella fase STEP 2-5
+        stage = self.profiler.start('STEP 1: lettura, filtro e chiavi di gruppo')
         sink_filtered = None
+        filtered_writer = None
         dest_id_filtered = None
+        prefix_filter = None
+        request = QgsFeatureRequest()
 
         if use_filter and filter_prefixes_text:
             filter_prefixes = [p.strip() for p in filter_prefixes_text.split(',')]
@@ -306,93 +1898,219 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
                 parameters, self.OUTPUT_FILTERED, context,
                 source.fields(), source.wkbType(), source.sourceCrs()
             )
-
-            filter_exp = QgsExpression('regexp_substr("{}", \'(^.+\\\\d)\')'.format(field_name))
-            exp_context = QgsExpressionContext()
-            exp_context.appendScopes(QgsExpressionContextUtils.globalProjectLayerScopes(None))
-            
-            filtered_features = []
-            for feature in features:
-                exp_context.setFeature(feature)
-                prefix_value = filter_exp.evaluate(exp_context)
-                if prefix_value:
-                    prefix_str = str(prefix_value).upper()
-                    if any(prefix_str.startswith(p.upper()) for p in filter_prefixes):
-                        filtered_features.append(feature)
-                        if sink_filtered:
-                            sink_filtered.addFeature(feature, QgsFeatureSink.FastInsert)
-            
-            features = filtered_features
-            feedback.pushInfo(self.tr('Features filtrate: {}').format(len(features)))
+            if sink_filtered:
+                filtered_writer = self.create_writer(sink_filtered, source.fields(), batch_size)
+            # Prefiltro eseguito dal provider, verifica esatta in Python
+            filter_expression, prefix_filter = self.create_prefix_filter(field_name, filter_prefixes)
+            request.setFilterExpression(filter_expression)
+
+        checkpoint = None
+        if checkpoint_path:
+            # Manifest: parametri che determinano gruppi, dissolve e segmenti, e identita del layer
+            manifest = {
+                'source': [source.sourceName(), source.featureCount(), source.sourceExtent().toString(),
+                           source.fields().names()],
+                'expression': expression_text, 'field_name': field_name,
+                'filter': use_filter and filter_prefixes_text, 'exception_values': exception_values,
+                'dedup_tolerance': dedup_tolerance, 'adjacency_rule': adjacency_rule,
+                'adjacency_tolerance': adjacency_tolerance, 'coverage_mode': coverage_mode,
+                'topology_mode': topology_mode
+            }
+            try:
+                checkpoint = self.exit_stack.enter_context(Checkpoint(checkpoint_path, manifest, resume))
+            except sqlite3.Error as e:
+                raise QgsProcessingException(
+                    self.tr('Checkpoint non valido ({}): {}').format(checkpoint_path, e)
+                )
+            if checkpoint.valid:
+                feedback.pushInfo(self.tr('Ripresa dal checkpoint: {} gruppi gia dissolti').format(
+                    checkpoint.groups_done))
+            elif resume:
+                feedback.pushWarning(self.tr('Checkpoint assente o con parametri diversi: elaborazione completa'))
 
         # STEP 2: Dissolve poligonale
-        dissolved_polygons = self.dissolve_polygons(features, expression_text, field_name, feedback, context)
-        
-        # STEP 3: Converti a single-part e scrivi output poligonale
+        if checkpoint is not None and checkpoint.stage_done(Checkpoint.DISSOLVE) and not sink_adjacency:
+            feedback.pushInfo(self.tr('Dissolve gia completato nel checkpoint: lettura del layer saltata'))
+            if filtered_writer:
+                for feature in source.getFeatures(request):
+                    if prefix_filter(feature):
+                        filtered_writer.addFeature(feature)
+            dissolved_polygons = iter(())
+        elif tile_size > 0:
+            dissolved_polygons = self.dissolve_polygons_tiled(
+                source, expression_text, field_name, feedback, context,
+                expression_context=expression_context,
+                request=request, prefix_filter=prefix_filter, sink_filtered=filtered_writer,
+                tile_size=tile_size,
+                adjacency_rule=adjacency_rule, adjacency_tolerance=adjacency_tolerance,
+                coverage_mode=coverage_mode, workers=workers
+            )
+        elif streaming:
+            dissolved_polygons = self.dissolve_polygons_streaming(
+                source, expression_text, field_name, feedback, context,
+                expression_context=expression_context,
+                request=request, prefix_filter=prefix_filter, sink_filtered=filtered_writer,
+                adjacency_rule=adjacency_rule, adjacency_tolerance=adjacency_tolerance,
+                coverage_mode=coverage_mode, workers=workers, checkpoint=checkpoint
+            )
+        else:
+            # Lettura completa prima del raggruppamento: qui la pipeline non sovrappone la lettura
+            features = list(source.getFeatures(request))
+            if prefix_filter is not None:
+                features = [feature for feature in features if prefix_filter(feature)]
+                if filtered_writer:
+                    for feature in features:
+                        filtered_writer.addFeature(feature)
+                feedback.pushInfo(self.tr('Features filtrate: {}').format(len(features)))
+
+            if sink_adjacency or graph_path:
+                # Grafo salvato per le stesse geometrie: niente test di adiacenza
+                stage_graph = self.profiler.start('Grafo di adiacenza')
+                graph_key = AdjacencyGraph.input_key(features, adjacency_rule, adjacency_tolerance)
+                try:
+                    graph = AdjacencyGraph.load(graph_path, graph_key) if graph_path else None
+                    if graph is not None:
+                        feedback.pushInfo(self.tr('Grafo di adiacenza caricato da {}: {} archi').format(
+                            graph_path, len(graph)))
+                    else:
+                        graph = self.build_adjacency_graph(features, adjacency_rule, adjacency_tolerance, feedback)
+                        feedback.pushInfo(self.tr('Grafo di adiacenza calcolato: {} archi').format(len(graph)))
+                        if graph_path and not feedback.isCanceled():
+                            graph.save(graph_path, graph_key)
+                except sqlite3.Error as e:
+                    raise QgsProcessingException(
+                        self.tr('Grafo di adiacenza non valido ({}): {}').format(graph_path, e)
+                    )
+                self.adjacency_graph = graph
+                self.profiler.stop(stage_graph, len(graph))
+
+                if sink_adjacency:
+                    adjacency_writer = self.create_writer(sink_adjacency, adjacency_fields, batch_size)
+                    for fid_a, fid_b, shared_length in graph.edges:
+                        adjacency_writer.write(QgsGeometry(), [fid_a, fid_b, shared_length])
+                    self.close_writer(adjacency_writer, self.tr('Adjacency graph'), feedback)
+
+            if cache_path:
+                # La cache vale solo per gli stessi parametri
+                settings_hash = hashlib.sha1(repr((
+                    expression_text, field_name, use_filter and filter_prefixes_text, exception_values,
+                    dedup_tolerance, adjacency_rule, adjacency_tolerance, coverage_mode
+                )).encode('utf-8')).hexdigest()
+                try:
+                    with IncrementalCache(cache_path, settings_hash) as cache:
+                        if not cache.valid:
+                            feedback.pushInfo(self.tr('Cache incrementale vuota o con parametri diversi: ricalcolo completo'))
+                        dissolved_polygons = self.dissolve_polygons_incremental(
+                            features, expression_text, field_name, feedback, context, cache,
+                            expression_context=expression_context,
+                            adjacency_rule=adjacency_rule, adjacency_tolerance=adjacency_tolerance,
+                            coverage_mode=coverage_mode
+                        )
+                except sqlite3.Error as e:
+                    raise QgsProcessingException(
+                        self.tr('Cache incrementale non valida ({}): {}').format(cache_path, e)
+                    )
+            else:
+                dissolved_polygons = self.dissolve_polygons(
+                    features, expression_text, field_name, feedback, context,
+                    expression_context=expression_context,
+                    adjacency_rule=adjacency_rule, adjacency_tolerance=adjacency_tolerance,
+                    coverage_mode=coverage_mode, workers=workers, checkpoint=checkpoint
+                )
+
+            # Le feature restano referenziate solo dai gruppi ancora da dissolvere
+            del features
+
+        if checkpoint is not None:
+            # Prima i poligoni dei gruppi gia completati, nello stesso ordine
+            dissolved_polygons = chain(checkpoint.dissolved_results(), dissolved_polygons)
+        self.profiler.stop(stage)
+
+        # STEP 3-5: In un solo passaggio ogni poligono dissolto viene esploso in
+        # single-part, scritto nell'output poligonale e i segmenti del suo bordo
+        # aggiunti agli array dei segmenti; nessuna lista intermedia di geometrie.
+        # In modalita topologica gli anelli restano vertici contigui: niente segmenti
+        # a due punti
+        stage = self.profiler.start('STEP 2-5: dissolve, single-part e segmenti dei bordi')
+        if topology_mode:
+            segment_store = RingStore(self.create_exception_matcher(exception_values))
+        else:
+            segment_store = SegmentStore(self.create_exception_matcher(exception_values))
         unique_id = 1
-        all_polygons_with_id = []
-        
+        lines_count = 0
+
         for dissolved_geom, note_val, nro_val in dissolved_polygons:
-            if dissolved_geom.isMultipart():
-                parts = dissolved_geom.asGeometryCollection()
-                for part in parts:
-                    out_feature = QgsFeature(fields)
-                    out_feature.setGeometry(part)
-                    out_feature[field_name] = note_val
-                    out_feature['nro'] = nro_val
-                    out_feature['id'] = unique_id
-                    sink_poly.addFeature(out_feature, QgsFeatureSink.FastInsert)
-                    all_polygons_with_id.append((part, note_val, nro_val, unique_id))
-                    unique_id += 1
-            else:
-                out_feature = QgsFeature(fields)
-                out_feature.setGeometry(dissolved_geom)
-                out_feature[field_name] = note_val
-                out_feature['nro'] = nro_val
-                out_feature['id'] = unique_id
-                sink_poly.addFeature(out_feature, QgsFeatureSink.FastInsert)
-                all_polygons_with_id.append((dissolved_geom, note_val, nro_val, unique_id))
+            if feedback.isCanceled():
+                break
+            parts = dissolved_geom.asGeometryCollection() if dissolved_geom.isMultipart() else [dissolved_geom]
+            for part in parts:
+                poly_writer.write(part, [note_val, nro_val, unique_id])
+                with self.profiler.timer('Bordi in segmenti'):
+                    if segment_store.add_polygon(part, note_val, nro_val, unique_id):
+                        lines_count += 1
                 unique_id += 1
+        del dissolved_polygons
+        if checkpoint is not None and not feedback.isCanceled():
+            checkpoint.finish_stage(Checkpoint.DISSOLVE)
+
+        if filtered_writer:
+            self.close_writer(filtered_writer, self.tr('Filtered polygons'), feedback)
+
+        self.close_writer(poly_writer, self.tr('Dissolved polygons'), feedback)
+        self.profiler.stop(stage, unique_id - 1)
+        feedback.pushInfo(self.tr('Poligoni dissolti: {}').format(unique_id - 1))
+
+        feedback.pushInfo(self.tr('Linee estratte: {}').format(lines_count))
+        feedback.pushInfo(self.tr('Segmenti totali: {}').format(len(segment_store)))
+
+        if topology_mode:
+            # STEP 6: Mappa degli spigoli condivisi costruita una volta dai vertici degli
+            # anelli: per ogni spigolo se va emesso e il poligono vicino
+            stage = self.profiler.start('STEP 6: spigoli condivisi degli anelli')
+            kept, neighbours = self.ring_edge_topology(segment_store, exception_values, feedback, dedup_tolerance)
+            self.profiler.stop(stage, len(kept))
+
+            # STEP 7-8: Archi dai tratti di spigoli con lo stesso vicino, scritti e
+            # dissolti per (field_name, nro, id)
+            stage = self.profiler.start('STEP 7-8: archi e dissolve lineare')
+            arcs = self.build_arcs(segment_store, kept, neighbours, feedback)
+            lines_count = self.dissolve_lines_by_attributes(
+                segment_store, self.write_arcs(arcs, segment_store, lines_writer, feedback),
+                lines_dissolved_writer, feedback
+            )
+            self.profiler.stop(stage, lines_count)
+        else:
+            # STEP 6: Elimina duplicati geometrici
+            stage = self.profiler.start('STEP 6: eliminazione duplicati')
+            if checkpoint is not None and checkpoint.stage_done(Checkpoint.SEGMENTS):
+                unique_segments = checkpoint.segments()
+            else:
+                unique_segments = self.remove_duplicate_segments(segment_store, exception_values, feedback, dedup_tolerance)
+                if checkpoint is not None and not feedback.isCanceled():
+                    checkpoint.save_segments(unique_segments)
+            self.profiler.stop(stage, len(unique_segments))
+
+            feedback.pushInfo(self.tr('Segmenti unici: {}').format(len(unique_segments)))
+
+            # STEP 7: Scrivi segmenti in Lines without duplicates
+            stage = self.profiler.start('STEP 7: scrittura segmenti')
+            for i in unique_segments:
+                if feedback.isCanceled():
+                    break
+                lines_writer.write(segment_store.segment_geometry(i), list(segment_store.segment_attributes(i)))
+            self.profiler.stop(stage, len(unique_segments))
+
+            # STEP 8: Dissolve segmenti per (field_name, nro, id)
+            stage = self.profiler.start('STEP 8: dissolve lineare')
+            lines_count = self.dissolve_lines_by_attributes(
+                segment_store,
+                ((segment_store.owner[i], segment_store.segment_coordinates(i)) for i in unique_segments),
+                lines_dissolved_writer, feedback
+            )
+            self.profiler.stop(stage, lines_count)
 
-        feedback.pushInfo(self.tr('Poligoni dissolti: {}').format(len(all_polygons_with_id)))
-
-        # STEP 4: Converti poligoni in linee (boundary)
-        lines_with_attrs = []
-        for poly_geom, note_val, nro_val, id_val in all_polygons_with_id:
-            # Estrai il boundary dalla geometria
-            geom_const = poly_geom.constGet()
-            if geom_const:
-                boundary = geom_const.boundary()
-                if boundary:
-                    boundary_geom = QgsGeometry(boundary)
-                    lines_with_attrs.append((boundary_geom, note_val, nro_val, id_val))
-
-        feedback.pushInfo(self.tr('Linee estratte: {}').format(len(lines_with_attrs)))
-
-        # STEP 5: Esplodi linee in segmenti
-        all_segments = []
-        for line_geom, note_val, nro_val, id_val in lines_with_attrs:
-            segments = self.explode_line_to_segments(line_geom, note_val, nro_val, id_val)
-            all_segments.extend(segments)
-
-        feedback.pushInfo(self.tr('Segmenti totali: {}').format(len(all_segments)))
-
-        # STEP 6: Elimina duplicati geometrici
-        unique_segments = self.remove_duplicate_segments(all_segments, exception_values, feedback)
-
-        feedback.pushInfo(self.tr('Segmenti unici: {}').format(len(unique_segments)))
-
-        # STEP 7: Scrivi segmenti in Lines without duplicates
-        for seg_geom, note_val, nro_val, id_val in unique_segments:
-            out_feature = QgsFeature(fields)
-            out_feature.setGeometry(seg_geom)
-            out_feature[field_name] = note_val
-            out_feature['nro'] = nro_val
-            out_feature['id'] = id_val
-            sink_lines.addFeature(out_feature, QgsFeatureSink.FastInsert)
-
-        # STEP 8: Dissolve segmenti per (field_name, nro, id)
-        self.dissolve_lines_by_attributes(unique_segments, sink_lines_dissolved, fields, field_name, feedback)
+        self.close_writer(lines_writer, self.tr('Lines without duplicates'), feedback)
+        self.close_writer(lines_dissolved_writer, self.tr('Lines dissolved by attributes'), feedback)
 
         feedback.pushInfo(self.tr('Processing completato!'))
 
@@ -403,163 +2121,951 @@ class DissolveAdjacentByExpressionAlgorithm(QgsProcessingAlgorithm):
         }
         if dest_id_filtered:
             result[self.OUTPUT_FILTERED] = dest_id_filtered
+        if sink_adjacency:
+            result[self.OUTPUT_ADJACENCY] = dest_id_adjacency
+        if graph_path:
+            result[self.ADJACENCY_GRAPH] = graph_path
+        if cache_path:
+            result[self.INCREMENTAL_CACHE] = cache_path
+
+        if self.profiler.enabled:
+            metrics = self.profiler.metrics()
+            self.report_profile(metrics, feedback)
+            result[self.METRICS] = json.dumps(metrics)
+            if metrics_path:
+                with open(metrics_path, 'w', encoding='utf-8') as metrics_file:
+                    json.dump(metrics, metrics_file, indent=2)
+                result[self.OUTPUT_METRICS] = metrics_path
 
         return result
 
-    def dissolve_polygons(self, features, expression_text, field_name, feedback, context):
+    def dissolve_polygons(self, features, expression_text, field_name, feedback, context,
+                          expression_context=None,
+                          adjacency_rule=AdjacencyPredicate.TOUCHES, adjacency_tolerance=0.0,
+                          coverage_mode=False, workers=1, checkpoint=None):
         """Dissolve poligoni per espressione e adiacenza."""
-        exp = QgsExpression(expression_text)
-        exp_context = QgsExpressionContext()
-        exp_context.appendScopes(QgsExpressionContextUtils.globalProjectLayerScopes(None))
+        if expression_context is None:
+            expression_context = self.default_expression_context(features[0].fields() if features else None)
+        evaluator = GroupingEvaluator(expression_text, expression_context)
 
         # Raggruppa per valore espressione
         groups = {}
         for feature in features:
-            exp_context.setFeature(feature)
-            exp_value = str(exp.evaluate(exp_context)) if exp.evaluate(exp_context) is not None else 'NULL'
+            exp_value = evaluator.group_key(feature)
             if exp_value not in groups:
                 groups[exp_value] = []
             groups[exp_value].append(feature)
 
         feedback.pushInfo(self.tr('Gruppi per espressione: {}').format(len(groups)))
+        self.report_evaluator_stats(evaluator, feedback)
+
+        # Gruppi gia completati nel checkpoint
+        keys = list(groups)
+        if checkpoint is not None:
+            for key in keys[:checkpoint.groups_done]:
+                del groups[key]
+            keys = keys[checkpoint.groups_done:]
+
+        # Dissolve ogni gruppo, rilasciandolo appena dissolto
+        return self.dissolve_groups(
+            (groups.pop(key) for key in keys), field_name, feedback,
+            adjacency_rule, adjacency_tolerance, coverage_mode, workers, checkpoint
+        )
 
-        # Dissolve ogni gruppo
-        dissolved_results = []
-        for group_value, group_features in groups.items():
-            if len(group_features) == 1:
-                dissolved_results.append((
-                    group_features[0].geometry(),
-                    group_features[0][field_name],
-                    1
-                ))
-            else:
-                clusters = self.find_adjacent_clusters(group_features)
-                for cluster in clusters:
-                    note_values = list(dict.fromkeys([f[field_name] for f in cluster]))
-                    concatenated_note = ",".join(str(v) if v is not None else "" for v in note_values)
-                    nro_count = len(note_values)
-                    
-                    geoms = [f.geometry() for f in cluster]
-                    dissolved_geom = QgsGeometry.unaryUnion(geoms)
-                    
-                    if not dissolved_geom.isNull():
-                        dissolved_results.append((dissolved_geom, concatenated_note, nro_count))
+    def dissolve_polygons_incremental(self, features, expression_text, field_name, feedback, context, cache,
+                                      expression_context=None,
+                                      adjacency_rule=AdjacencyPredicate.TOUCHES, adjacency_tolerance=0.0,
+                                      coverage_mode=False):
+        """Dissolve incrementale: ricalcola solo i cluster con feature modificate o vicine a una modifica."""
+        if expression_context is None:
+            expression_context = self.default_expression_context(features[0].fields() if features else None)
+        evaluator = GroupingEvaluator(expression_text, expression_context)
+
+        group_keys = [evaluator.group_key(feature) for feature in features]
+        hashes = [feature_hash(feature, field_name, key) for feature, key in zip(features, group_keys)]
+        groups = {}
+        for i, key in enumerate(group_keys):
+            groups.setdefault(key, []).append(i)
 
-        return dissolved_results
+        feedback.pushInfo(self.tr('Gruppi per espressione: {}').format(len(groups)))
+        self.report_evaluator_stats(evaluator, feedback)
+
+        # Feature nuove o modificate e feature eliminate
+        cached = cache.feature_rows()
+        changed = set()
+        for i, feature in enumerate(features):
+            row = cached.get(feature.id())
+            if row is None or row[0] != hashes[i]:
+                changed.add(i)
+        present = {feature.id() for feature in features}
+        deleted = [fid for fid in cached if fid not in present]
+
+        # Cluster da ricalcolare: quelli che contenevano feature modificate o eliminate...
+        dirty = {cached[fid][1] for fid in deleted}
+        dirty.update(cached[features[i].id()][1] for i in changed if features[i].id() in cached)
+
+        # ...e quelli adiacenti a una feature modificata (possibili nuove unioni)
+        changed_by_group = {}
+        for i in sorted(changed):
+            changed_by_group.setdefault(group_keys[i], []).append(i)
+        for key, changed_positions in changed_by_group.items():
+            members = groups[key]
+            if len(members) == len(changed_positions):
+                continue
+            predicate = AdjacencyPredicate([features[i].geometry() for i in members], adjacency_rule, adjacency_tolerance)
+            index = QgsSpatialIndex()
+            for local, box in enumerate(predicate.boxes):
+                index.addFeature(local, box)
+            local_of = {i: local for local, i in enumerate(members)}
+            for i in changed_positions:
+                a = local_of[i]
+                for b in index.intersects(predicate.search_box(a)):
+                    j = members[b]
+                    if j in changed:
+                        continue
+                    cluster = cached[features[j].id()][1]
+                    if cluster not in dirty and predicate.adjacent(a, b):
+                        dirty.add(cluster)
+
+        # Cluster invariati: risultati riletti dalla cache
+        clean_members = {}
+        for i, feature in enumerate(features):
+            if i not in changed:
+                clean_members.setdefault(cached[feature.id()][1], []).append(i)
+        cached_results = cache.cluster_results(set(clean_members) - dirty)
+        dirty.update(cluster for cluster in clean_members if cluster not in cached_results)
+
+        # Un gruppo di una sola feature e scritto grezzo, gli altri passano dal dissolve:
+        # se la dimensione del gruppo passa da o verso 1 il risultato salvato non vale piu
+        for cluster, members in clean_members.items():
+            if cluster in cached_results:
+                single = len(groups[group_keys[members[0]]]) == 1
+                if cached_results[cluster][1] != single:
+                    dirty.add(cluster)
+
+        recompute_groups = {}
+        for i in range(len(features)):
+            if i in changed or cached[features[i].id()][1] in dirty:
+                recompute_groups.setdefault(group_keys[i], []).append(i)
+
+        # Ordine dei risultati come nel ricalcolo completo: gruppo, poi prima feature del cluster
+        group_rank = {key: rank for rank, key in enumerate(groups)}
+        entries = []
+        for cluster, members in clean_members.items():
+            if cluster not in dirty:
+                entries.append((group_rank[group_keys[members[0]]], members[0], cached_results[cluster][0]))
+
+        next_cluster = cache.next_cluster_id()
+        feature_rows = []
+        cluster_results = []
+        for key, positions in recompute_groups.items():
+            if feedback.isCanceled():
+                # Cache lasciata invariata
+                return []
+
+            if len(groups[key]) == 1:
+                feature = features[positions[0]]
+                clusters = [positions]
+                results = [(feature.geometry(), feature[field_name], 1)]
+            else:
+                geometries = [features[i].geometry() for i in positions]
+                clusters = [
+                    [positions[k] for k in cluster]
+                    for cluster in self.cluster_geometries(
+                        geometries, adjacency_rule, adjacency_tolerance, feedback=feedback
+                    )
+                ]
+                if feedback.isCanceled():
+                    return []
+                results = [
+                    self.dissolve_cluster(
+                        [features[i].geometry() for i in cluster],
+                        [note_token(features[i][field_name]) for i in cluster],
+                        coverage_mode
+                    )
+                    for cluster in clusters
+                ]
+
+            for cluster, result in zip(clusters, results):
+                entries.append((group_rank[key], cluster[0], result))
+                feature_rows.extend((features[i].id(), hashes[i], next_cluster) for i in cluster)
+                cluster_results.append((next_cluster, result, len(groups[key]) == 1))
+                next_cluster += 1
+
+        cache.update(deleted, dirty, feature_rows, cluster_results)
+        feedback.pushInfo(self.tr('Feature modificate: {}, eliminate: {}').format(len(changed), len(deleted)))
+        feedback.pushInfo(self.tr('Cluster ricalcolati: {}, riutilizzati dalla cache: {}').format(
+            len(cluster_results), len(entries) - len(cluster_results)))
+
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        return [result for _, _, result in entries if result is not None]
+
+    def dissolve_polygons_streaming(self, source, expression_text, field_name, feedback, context,
+                                    expression_context=None,
+                                    request=None, prefix_filter=None, sink_filtered=None,
+                                    adjacency_rule=AdjacencyPredicate.TOUCHES, adjacency_tolerance=0.0,
+                                    coverage_mode=False, workers=1, checkpoint=None):
+        """Dissolve in streaming: raggruppa i fid, poi carica le geometrie un gruppo alla volta."""
+        if expression_context is None:
+            expression_context = self.default_expression_context(source.fields())
+        evaluator = GroupingEvaluator(expression_text, expression_context)
+        exp = evaluator.expression
+
+        # Primo passaggio: solo fid e attributi usati da espressione e filtro.
+        # Se il layer filtrato va scritto servono comunque le feature complete.
+        request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+        if sink_filtered is None:
+            attributes = set(exp.referencedColumns())
+            attributes.add(field_name)
+            if QgsFeatureRequest.ALL_ATTRIBUTES not in attributes:
+                request.setSubsetOfAttributes(list(attributes), source.fields())
+            if not exp.needsGeometry():
+                request.setFlags(QgsFeatureRequest.NoGeometry)
 
-    def find_adjacent_clusters(self, features):
-        """Trova cluster di feature adiacenti."""
-        clusters = []
-        remaining = list(features)
+        groups = {}
+        filtered_count = 0
+        for feature in self.read_features(source, request, feedback):
+            if prefix_filter is not None:
+                if not prefix_filter(feature):
+                    continue
+                filtered_count += 1
+                if sink_filtered:
+                    sink_filtered.addFeature(feature, QgsFeatureSink.FastInsert)
+
+            groups.setdefault(evaluator.group_key(feature), []).append(feature.id())
+
+        if prefix_filter is not None:
+            feedback.pushInfo(self.tr('Features filtrate: {}').format(filtered_count))
+        feedback.pushInfo(self.tr('Gruppi per espressione: {}').format(len(groups)))
+        self.report_evaluator_stats(evaluator, feedback)
+
+        # Secondo passaggio: geometrie caricate gruppo per gruppo; con la pipeline
+        # il gruppo successivo viene letto mentre il precedente e in dissolve
+        fid_lists = list(groups.values())
+        if checkpoint is not None:
+            # I gruppi gia completati nel checkpoint non vengono caricati
+            fid_lists = fid_lists[checkpoint.groups_done:]
+        fid_groups = self.fetch_groups(source, fid_lists, field_name)
+        if self.queue_depth > 0:
+            fid_groups = self.exit_stack.enter_context(closing(FeaturePrefetcher(fid_groups, feedback, 1)))
+        return self.dissolve_groups(
+            fid_groups, field_name, feedback,
+            adjacency_rule, adjacency_tolerance, coverage_mode, workers, checkpoint
+        )
 
-        while remaining:
-            current_cluster = [remaining.pop(0)]
-            changed = True
+    def dissolve_polygons_tiled(self, source, expression_text, field_name, feedback, context,
+                                expression_context=None,
+                                request=None, prefix_filter=None, sink_filtered=None, tile_size=0.0,
+                                adjacency_rule=AdjacencyPredicate.TOUCHES, adjacency_tolerance=0.0,
+                                coverage_mode=False, workers=1):
+        """Dissolve a tasselli (generatore): cluster interni risolti per tassello, cluster sul bordo ricuciti alla fine."""
+        if expression_context is None:
+            expression_context = self.default_expression_context(source.fields())
+        evaluator = GroupingEvaluator(expression_text, expression_context)
+        exp = evaluator.expression
+
+        grid = TileGrid(source.sourceExtent(), tile_size)
+        margin = adjacency_tolerance if adjacency_rule == AdjacencyPredicate.WITHIN_DISTANCE else 0.0
+        feedback.pushInfo(self.tr('Tasselli: {} ({} x {})').format(len(grid), grid.columns, grid.rows))
+
+        request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+        if sink_filtered is None:
+            attributes = set(exp.referencedColumns())
+            attributes.add(field_name)
+            if QgsFeatureRequest.ALL_ATTRIBUTES not in attributes:
+                request.setSubsetOfAttributes(list(attributes), source.fields())
+
+        # Feature uniche del proprio gruppo sull'intero layer (lettura senza geometria):
+        # solo i loro cluster restano grezzi, gli altri passano da dissolve_cluster come nel default
+        count_request = QgsFeatureRequest(request)
+        if not exp.needsGeometry():
+            count_request.setFlags(QgsFeatureRequest.NoGeometry)
+        group_sizes = Counter()
+        group_members = {}
+        for feature in source.getFeatures(count_request):
+            if prefix_filter is not None and not prefix_filter(feature):
+                continue
+            key = evaluator.group_key(feature)
+            group_sizes[key] += 1
+            group_members[key] = feature.id()
+        single_fids = frozenset(group_members[key] for key, size in group_sizes.items() if size == 1)
+        del group_sizes, group_members
+
+        # Per chiave di gruppo: cluster sul bordo come liste di (fid, sul bordo)
+        seam_groups = {}
+        filtered_count = 0
+        seam_clusters_count = 0
+
+        with ExitStack() as stack:
+            pool = None
+            if workers > 1:
+                feedback.pushInfo(self.tr('Dissolve parallelo con {} processi').format(workers))
+                pool = stack.enter_context(ParallelDissolver(
+                    self, workers, field_name, feedback, adjacency_rule, adjacency_tolerance, coverage_mode
+                ))
 
-            while changed and remaining:
-                changed = False
-                to_remove = []
+            # Con la pipeline il tassello successivo viene letto mentre il corrente e in dissolve
+            tiles = self.read_tiles(source, request, grid, margin)
+            if self.queue_depth > 0:
+                tiles = stack.enter_context(closing(FeaturePrefetcher(tiles, feedback, 1)))
+
+            for tile_index, tile_features in tiles:
+                if feedback.isCanceled():
+                    break
+                feedback.setProgress(100.0 * tile_index / len(grid))
+
+                # Feature del tassello (centro del bbox nel tassello) e feature vicine
+                # di altri tasselli, di cui serve solo il bbox
+                groups = {}
+                foreign_index = QgsSpatialIndex()
+                for feature in tile_features:
+                    if prefix_filter is not None and not prefix_filter(feature):
+                        continue
+                    box = feature.geometry().boundingBox()
+                    if grid.tile_of(box) != tile_index:
+                        foreign_index.addFeature(feature.id(), box)
+                        continue
+                    if prefix_filter is not None:
+                        filtered_count += 1
+                        if sink_filtered:
+                            sink_filtered.addFeature(feature, QgsFeatureSink.FastInsert)
+                    groups.setdefault(evaluator.group_key(feature), []).append(feature)
+
+                # Un cluster che tocca il bordo del tassello o una feature di un altro
+                # tassello puo proseguire oltre: viene rimandato alla ricucitura
+                interior_clusters = []
+                for key, group_features in groups.items():
+                    geometries = [f.geometry() for f in group_features]
+                    on_seam = []
+                    for geom in geometries:
+                        box = geom.boundingBox()
+                        on_seam.append(
+                            not grid.is_interior(box, tile_index, margin)
+                            or bool(foreign_index.intersects(box.buffered(margin) if margin > 0 else box))
+                        )
+
+                    if len(geometries) == 1:
+                        clusters = [[0]]
+                    else:
+                        clusters = self.cluster_geometries(
+                            geometries, adjacency_rule, adjacency_tolerance, feedback=feedback
+                        )
+                    for cluster in clusters:
+                        if any(on_seam[i] for i in cluster):
+                            seam_groups.setdefault(key, []).append(
+                                [(group_features[i].id(), on_seam[i]) for i in cluster]
+                            )
+                            seam_clusters_count += 1
+                        else:
+                            interior_clusters.append([group_features[i] for i in cluster])
+
+                del tile_features
+                yield from self.dissolve_feature_clusters(interior_clusters, field_name, coverage_mode, pool, single_fids)
+
+            if prefix_filter is not None:
+                feedback.pushInfo(self.tr('Features filtrate: {}').format(filtered_count))
+            self.report_evaluator_stats(evaluator, feedback)
+            feedback.pushInfo(self.tr('Cluster sul bordo dei tasselli: {}').format(seam_clusters_count))
+
+            # Ricucitura: l'adiacenza tra tasselli e verificata solo sulle feature di bordo,
+            # le sole caricate per il gruppo; i membri di ogni cluster ricucito sono poi
+            # caricati e dissolti un cluster alla volta
+            stitched_count = 0
+            for key, tile_clusters in seam_groups.items():
+                if feedback.isCanceled():
+                    break
+                fids = sorted(fid for cluster in tile_clusters for fid, on_seam in cluster if on_seam)
+                by_fid = {f.id(): f for f in next(self.fetch_groups(source, [fids], field_name))}
+
+                # Le feature di bordo di uno stesso cluster partono gia unite
+                geometries = []
+                cluster_of = []
+                uf_pairs = []
+                for c, cluster in enumerate(tile_clusters):
+                    first = len(geometries)
+                    for fid, on_seam in cluster:
+                        if on_seam and fid in by_fid:
+                            geometries.append(by_fid[fid].geometry())
+                            cluster_of.append(c)
+                    uf_pairs.extend((first, i) for i in range(first + 1, len(geometries)))
+                uf = UnionFind(len(geometries))
+                for a, b in uf_pairs:
+                    uf.union(a, b)
+
+                merged_fids = []
+                for component in self.cluster_geometries(geometries, adjacency_rule, adjacency_tolerance, uf, feedback):
+                    merged_fids.append(sorted(
+                        fid for c in {cluster_of[i] for i in component} for fid, _ in tile_clusters[c]
+                    ))
+                del by_fid, geometries
+                merged_fids.sort(key=itemgetter(0))
+                stitched_count += len(merged_fids)
+
+                merged_clusters = (cluster for cluster in self.fetch_groups(source, merged_fids, field_name) if cluster)
+                yield from self.dissolve_feature_clusters(merged_clusters, field_name, coverage_mode, pool, single_fids)
+
+        feedback.pushInfo(self.tr('Cluster ricuciti: {}').format(stitched_count))
+
+    def dissolve_feature_clusters(self, clusters, field_name, coverage_mode=False, pool=None,
+                                  single_fids=frozenset()):
+        """Dissolve cluster di feature gia calcolati, in sequenza o con il pool di processi.
+
+        Un cluster di una sola feature resta grezzo solo se la feature e l'unica del
+        suo gruppo (single_fids); altrimenti passa da dissolve_cluster come nel default.
+        """
+        if pool is not None:
+            return pool.run(clusters, clustered=True, single_fids=single_fids)
 
-                for i, candidate in enumerate(remaining):
-                    for cluster_feature in current_cluster:
-                        if candidate.geometry().touches(cluster_feature.geometry()):
-                            current_cluster.append(candidate)
-                            to_remove.append(i)
-                            changed = True
-                            break
+        dissolved_results = []
+        for cluster in clusters:
+            if len(cluster) == 1 and cluster[0].id() in single_fids:
+                dissolved_results.append((cluster[0].geometry(), cluster[0][field_name], 1))
+                continue
+            dissolved = self.dissolve_cluster(
+                [f.geometry() for f in cluster], [note_token(f[field_name]) for f in cluster], coverage_mode
+            )
+            if dissolved is not None:
+                dissolved_results.append(dissolved)
+        return dissolved_results
 
-                for i in reversed(to_remove):
-                    remaining.pop(i)
+    def fetch_groups(self, source, fid_groups, field_name):
+        """Carica le feature di ogni gruppo di fid, un gruppo alla volta."""
+        for fids in fid_groups:
+            request = QgsFeatureRequest().setFilterFids(fids)
+            request.setSubsetOfAttributes([field_name], source.fields())
+            by_fid = {feature.id(): feature for feature in source.getFeatures(request)}
+
+            # Mantieni l'ordine del primo passaggio
+            yield [by_fid[fid] for fid in fids if fid in by_fid]
+
+    def dissolve_groups(self, groups, field_name, feedback,
+                        adjacency_rule=AdjacencyPredicate.TOUCHES, adjacency_tolerance=0.0,
+                        coverage_mode=False, workers=1, checkpoint=None):
+        """Dissolve una sequenza di gruppi (generatore), in sequenza o con un pool di processi.
+
+        Con un checkpoint i risultati di ogni gruppo completato vi vengono registrati.
+        """
+        on_group = checkpoint.add_group if checkpoint is not None else None
+        if workers > 1:
+            feedback.pushInfo(self.tr('Dissolve parallelo con {} processi').format(workers))
+            with ParallelDissolver(self, workers, field_name, feedback,
+                                   adjacency_rule, adjacency_tolerance, coverage_mode) as pool:
+                yield from pool.run(groups, on_group=on_group)
+            return
+
+        for group_features in groups:
+            if feedback.isCanceled():
+                break
+
+            stage = None
+            if len(group_features) >= StageProfiler.LARGE_GROUP_SIZE:
+                stage = self.profiler.start('Gruppo di {} feature'.format(len(group_features)))
+            dissolved_results = self.dissolve_group(
+                group_features, field_name, adjacency_rule, adjacency_tolerance, coverage_mode, feedback
+            )
+            if feedback.isCanceled():
+                # Gruppo incompleto: non emesso ne registrato nel checkpoint
+                break
+            self.profiler.stop(stage, len(dissolved_results))
+            if on_group is not None:
+                on_group(dissolved_results)
+            yield from dissolved_results
+
+    def read_tiles(self, source, request, grid, margin):
+        """Feature di ogni tassello (rettangolo allargato del margine), un tassello alla volta."""
+        for tile_index in range(len(grid)):
+            rect = grid.rectangle(tile_index)
+            tile_request = QgsFeatureRequest(request)
+            tile_request.setFilterRect(rect.buffered(margin) if margin > 0 else rect)
+            yield tile_index, list(source.getFeatures(tile_request))
+
+    def read_features(self, source, request, feedback):
+        """Feature della richiesta, lette da un thread produttore se la pipeline e attiva."""
+        if self.queue_depth <= 0:
+            return source.getFeatures(request)
+        return self.exit_stack.enter_context(
+            closing(FeaturePrefetcher(source.getFeatures(request), feedback, self.queue_depth))
+        )
 
-            clusters.append(current_cluster)
+    def create_writer(self, sink, fields, batch_size):
+        """Writer a blocchi del sink, con thread di scrittura se la pipeline e attiva."""
+        if self.queue_depth <= 0:
+            return BatchedSinkWriter(sink, fields, batch_size)
+        writer = ThreadedSinkWriter(sink, fields, batch_size, self.queue_depth)
+        self.exit_stack.callback(writer.abort)
+        return writer
+
+    def close_writer(self, writer, name, feedback):
+        """Scrive le feature rimaste e riporta il throughput del sink."""
+        writer.close()
+        self.profiler.record_sink(name, writer)
+        feedback.pushInfo(self.tr('Scrittura "{}": {} feature in {:.2f} s ({:.0f} feature/s)').format(
+            name, writer.count, writer.elapsed, writer.throughput))
+
+    def report_profile(self, metrics, feedback):
+        """Riporta nel log le metriche del profiler."""
+        feedback.pushInfo(self.tr('Profilazione per fase:'))
+        for stage in metrics['stages']:
+            memory = '-' if stage['peak_rss_delta_kb'] is None else '{:+d} KB'.format(stage['peak_rss_delta_kb'])
+            feedback.pushInfo(self.tr('  {}: {:.3f} s, CPU {:.3f} s, picco memoria {}, elementi {}').format(
+                stage['name'], stage['wall_s'], stage['cpu_s'], memory,
+                '-' if stage['items'] is None else stage['items']))
+        for name, timer in metrics['timers'].items():
+            feedback.pushInfo(self.tr('  {}: {:.3f} s in {} chiamate').format(name, timer['wall_s'], timer['calls']))
+        if metrics['peak_rss_kb'] is not None:
+            feedback.pushInfo(self.tr('  Picco di memoria del processo: {} KB').format(metrics['peak_rss_kb']))
+
+    def default_expression_context(self, fields=None):
+        """Contesto espressioni senza layer (uso fuori da processAlgorithm)."""
+        exp_context = QgsExpressionContext()
+        exp_context.appendScopes(QgsExpressionContextUtils.globalProjectLayerScopes(None))
+        if fields is not None:
+            exp_context.setFields(fields)
+        return exp_context
+
+    def report_evaluator_stats(self, evaluator, feedback):
+        """Riporta le statistiche della cache dell'espressione di raggruppamento."""
+        if evaluator.memoized:
+            feedback.pushInfo(self.tr('Cache espressione: {} hit, {} miss ({} valori distinti in cache)').format(
+                evaluator.hits, evaluator.misses, len(evaluator.cache)))
+        else:
+            feedback.pushInfo(self.tr('Cache espressione non attiva: l\'espressione dipende dalla geometria o dalla feature'))
 
-        return clusters
+    def dissolve_group(self, group_features, field_name, adjacency_rule=AdjacencyPredicate.TOUCHES,
+                       adjacency_tolerance=0.0, coverage_mode=False, feedback=None):
+        """Dissolve i cluster di feature adiacenti di un gruppo."""
+        if len(group_features) == 1:
+            return [(group_features[0].geometry(), group_features[0][field_name], 1)]
 
-    def explode_line_to_segments(self, line_geom, note_val, nro_val, id_val):
-        """Esplode una linea in segmenti."""
-        segments = []
+        geometries = [f.geometry() for f in group_features]
+        tokens = [note_token(f[field_name]) for f in group_features]
 
-        if line_geom.isMultipart():
-            parts = line_geom.asMultiPolyline()
-            for part in parts:
-                for i in range(len(part) - 1):
-                    seg_geom = QgsGeometry.fromPolylineXY([part[i], part[i+1]])
-                    segments.append((seg_geom, note_val, nro_val, id_val))
+        dissolved_results = []
+        if self.adjacency_graph is not None:
+            with self.profiler.timer('Clustering'):
+                clusters = self.adjacency_graph.clusters(group_features)
         else:
-            vertices = line_geom.asPolyline()
-            for i in range(len(vertices) - 1):
-                seg_geom = QgsGeometry.fromPolylineXY([vertices[i], vertices[i+1]])
-                segments.append((seg_geom, note_val, nro_val, id_val))
-
-        return segments
+            clusters = self.cluster_geometries(geometries, adjacency_rule, adjacency_tolerance, feedback=feedback)
+        for cluster in clusters:
+            dissolved = self.dissolve_cluster(
+                [geometries[i] for i in cluster], [tokens[i] for i in cluster], coverage_mode
+            )
+            if dissolved is not None:
+                dissolved_results.append(dissolved)
 
-    def remove_duplicate_segments(self, all_segments, exception_values, feedback):
-        """Elimina duplicati geometrici con gestione eccezioni."""
-        segments_dict = {}
+        return dissolved_results
 
-        for seg_geom, note_val, nro_val, id_val in all_segments:
-            vertices = seg_geom.asPolyline()
-            if len(vertices) != 2:
+    def dissolve_cluster(self, geoms, tokens, coverage_mode=False):
+        """Unisce le geometrie di un cluster e concatena i valori distinti del campo."""
+        note_values = list(dict.fromkeys(tokens))
+        concatenated_note = ",".join(note_values)
+        nro_count = len(note_values)
+
+        with self.profiler.timer('Union'):
+            dissolved_geom = None
+            if coverage_mode and len(geoms) > 1:
+                dissolved_geom = self.coverage_union(geoms)
+            if dissolved_geom is None:
+                dissolved_geom = QgsGeometry.unaryUnion(geoms)
+
+        if dissolved_geom.isNull():
+            return None
+        return dissolved_geom, concatenated_note, nro_count
+
+    def coverage_union(self, geoms):
+        """Coverage union dei poligoni; None se l'input non e una copertura valida."""
+        dissolved_geom = QgsGeometry.collectGeometry(geoms).unionCoverage()
+        if dissolved_geom.isNull():
+            return None
+
+        # Con input sovrapposti la coverage union restituisce parti sovrapposte
+        # (MultiPolygon non valido, con area pari alla somma): lo rileva solo la validita
+        if not dissolved_geom.isGeosValid():
+            return None
+        return dissolved_geom
+
+    def create_prefix_filter(self, field_name, filter_prefixes):
+        """Crea il filtro per prefissi: espressione per il provider e verifica esatta."""
+        # Prefiltro compilabile dal provider (SQL per GeoPackage/PostGIS):
+        # scarta le feature il cui valore non inizia con nessun prefisso
+        column = QgsExpression.quotedColumnRef(field_name)
+        clauses = []
+        for prefix in filter_prefixes:
+            pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append('{} ILIKE {}'.format(column, QgsExpression.quotedString(pattern)))
+        filter_expression = ' OR '.join(clauses)
+
+        # Verifica esatta equivalente a regexp_substr("campo", '(^.+\\d)') seguito
+        # da startswith su ogni prefisso, con un'unica regex compilata
+        value_prefix = re.compile(r'.+[0-9]')
+        prefixes = re.compile('|'.join(re.escape(p) for p in filter_prefixes), re.IGNORECASE)
+
+        def matches(feature):
+            match = value_prefix.match(str(feature[field_name]))
+            return match is not None and prefixes.match(match.group(0)) is not None
+
+        return filter_expression, matches
+
+    def build_adjacency_graph(self, features, adjacency_rule=AdjacencyPredicate.TOUCHES,
+                              adjacency_tolerance=0.0, feedback=None):
+        """Grafo di adiacenza di tutte le feature, indipendente dai gruppi dell'espressione."""
+        predicate = AdjacencyPredicate([f.geometry() for f in features], adjacency_rule, adjacency_tolerance)
+        index = QgsSpatialIndex()
+        for i, box in enumerate(predicate.boxes):
+            index.addFeature(i, box)
+
+        edges = []
+        for i in range(len(features)):
+            if feedback is not None and feedback.isCanceled():
+                break
+            for j in sorted(index.intersects(predicate.search_box(i))):
+                if j > i and predicate.adjacent(i, j):
+                    fid_a, fid_b = sorted((features[i].id(), features[j].id()))
+                    edges.append((fid_a, fid_b, predicate.shared_boundary_length(i, j)))
+        return AdjacencyGraph(edges)
+
+    def cluster_geometries(self, geometries, adjacency_rule=AdjacencyPredicate.TOUCHES,
+                           adjacency_tolerance=0.0, uf=None, feedback=None):
+        """Indici dei cluster di geometrie adiacenti (indice spaziale + union-find).
+
+        Se l'utente annulla durante il clustering restituisce una lista vuota.
+        """
+        with self.profiler.timer('Clustering'):
+            predicate = AdjacencyPredicate(geometries, adjacency_rule, adjacency_tolerance)
+
+            # Indice spaziale sui bounding box, costruito una volta per gruppo
+            index = QgsSpatialIndex()
+            for i, box in enumerate(predicate.boxes):
+                index.addFeature(i, box)
+
+            # Unisci le coppie candidate adiacenti (uf puo contenere unioni gia note)
+            if uf is None:
+                uf = UnionFind(len(geometries))
+            for i in range(len(geometries)):
+                if feedback is not None and feedback.isCanceled():
+                    return []
+                for j in index.intersects(predicate.search_box(i)):
+                    if j <= i or uf.find(i) == uf.find(j):
+                        continue
+                    if predicate.adjacent(i, j):
+                        uf.union(i, j)
+
+        # Cluster ordinati per prima feature, membri in ordine di input
+        clusters = {}
+        for i in range(len(geometries)):
+            clusters.setdefault(uf.find(i), []).append(i)
+
+        return list(clusters.values())
+
+    # Limite delle coordinate agganciate alla griglia per restare in int64
+    MAX_GRID_COORDINATE = 2 ** 62
+
+    def remove_duplicate_segments(self, segment_store, exception_values, feedback, tolerance=0.000001):
+        """Indici dei segmenti senza duplicati geometrici, con gestione eccezioni."""
+        if np is not None and len(segment_store):
+            unique_segments = self.remove_duplicate_segments_vectorized(segment_store, exception_values, tolerance)
+            if unique_segments is not None:
+                return unique_segments
+            feedback.pushInfo(self.tr('Coordinate fuori scala per la griglia dei duplicati: uso il confronto per chiave'))
+
+        x1, y1, x2, y2 = segment_store.x1, segment_store.y1, segment_store.x2, segment_store.y2
+        first_seen = {}
+        unique_segments = array('q')
+
+        for i in range(len(segment_store)):
+            if feedback.isCanceled():
+                break
+            seg_key = self.get_segment_key(x1[i], y1[i], x2[i], y2[i], tolerance)
+            existing = first_seen.get(seg_key)
+
+            if existing is None:
+                first_seen[seg_key] = i
+                unique_segments.append(i)
                 continue
 
-            seg_key = self.get_segment_key(vertices[0], vertices[1])
-
-            if seg_key in segments_dict:
-                existing_geom, existing_note, existing_nro, existing_id = segments_dict[seg_key]
-                
-                should_keep = False
-                if exception_values:
-                    current_upper = str(note_val).upper() if note_val else ""
-                    existing_upper = str(existing_note).upper() if existing_note else ""
-                    
-                    exc_in_current = any(exc in current_upper for exc in exception_values)
-                    exc_in_existing = any(exc in existing_upper for exc in exception_values)
-                    
-                    if exc_in_current != exc_in_existing:
-                        should_keep = True
-
-                if should_keep:
-                    counter = 1
-                    unique_key = (seg_key, counter)
-                    while unique_key in segments_dict:
-                        counter += 1
-                        unique_key = (seg_key, counter)
-                    segments_dict[unique_key] = (seg_geom, note_val, nro_val, id_val)
+            # Duplicato: confronto con la prima occorrenza (logica XOR)
+            if exception_values:
+                if segment_store.segment_exception(i) != segment_store.segment_exception(existing):
+                    unique_segments.append(i)
+
+        return unique_segments
+
+    def remove_duplicate_segments_vectorized(self, segment_store, exception_values, tolerance):
+        """Come remove_duplicate_segments, con chiavi intere su griglia e ordinamento NumPy."""
+        # Aggancio alla griglia (arrotondamento half-even, come round())
+        grid = []
+        for coords in (segment_store.x1, segment_store.y1, segment_store.x2, segment_store.y2):
+            scaled = np.rint(np.frombuffer(coords, dtype=np.float64) / tolerance)
+            if np.abs(scaled).max() >= self.MAX_GRID_COORDINATE:
+                return None
+            grid.append(scaled.astype(np.int64))
+        order, group_start = self.sorted_key_groups(*grid)
+        del grid
+
+        owner = np.frombuffer(segment_store.owner, dtype=np.int32)
+        flags = np.frombuffer(segment_store.exception_flags, dtype=np.int8).astype(bool) if exception_values else None
+        return int64_array(np.flatnonzero(self.kept_mask(owner, flags, order, group_start)))
+
+    @staticmethod
+    def sorted_key_groups(qx1, qy1, qx2, qy2):
+        """Ordinamento dei segmenti per estremi su griglia: (order, group_start)."""
+        # Ordine canonico degli estremi
+        swap = (qx1 > qx2) | ((qx1 == qx2) & (qy1 > qy2))
+        ax = np.where(swap, qx2, qx1)
+        ay = np.where(swap, qy2, qy1)
+        bx = np.where(swap, qx1, qx2)
+        by = np.where(swap, qy1, qy2)
+        del qx1, qy1, qx2, qy2, swap
+
+        # Ordinamento stabile: in ogni gruppo di duplicati la prima e l'occorrenza originale
+        order = np.lexsort((by, bx, ay, ax))
+        ax, ay, bx, by = ax[order], ay[order], bx[order], by[order]
+        group_start = np.empty(len(order), dtype=bool)
+        group_start[0] = True
+        group_start[1:] = (ax[1:] != ax[:-1]) | (ay[1:] != ay[:-1]) | (bx[1:] != bx[:-1]) | (by[1:] != by[:-1])
+        del ax, ay, bx, by
+        return order, group_start
+
+    @staticmethod
+    def kept_mask(owner, polygon_flags, order, group_start):
+        """Maschera dei segmenti da mantenere dati i gruppi di duplicati ordinati.
+
+        polygon_flags (flag eccezione per poligono) e None senza valori di eccezione.
+        """
+        keep_sorted = group_start
+        if polygon_flags is not None:
+            # Logica XOR rispetto alla prima occorrenza di ogni gruppo
+            flags = polygon_flags[owner[order]]
+            first_flags = flags[group_start][np.cumsum(group_start) - 1]
+            keep_sorted = group_start | (flags != first_flags)
+
+        keep = np.empty(len(order), dtype=bool)
+        keep[order] = keep_sorted
+        return keep
+
+    def ring_edge_topology(self, ring_store, exception_values, feedback, tolerance=0.000001):
+        """Per ogni spigolo degli anelli, in ordine: (emesso, poligono vicino o -1).
+
+        Gli spigoli sono raggruppati una sola volta per chiave dei vertici agganciati alla
+        griglia: uno spigolo condiviso e emesso dalla sua prima occorrenza (con i valori di
+        eccezione anche dalle occorrenze con flag diverso, come nel default) e il vicino e
+        il primo altro poligono che lo contiene.
+        """
+        if np is not None and len(ring_store):
+            topology = self.ring_edge_topology_vectorized(ring_store, exception_values, tolerance)
+            if topology is not None:
+                return topology
+            feedback.pushInfo(self.tr('Coordinate fuori scala per la griglia degli spigoli: uso il confronto per chiave'))
+
+        # Mappa chiave -> [prima occorrenza, suo poligono, primo altro poligono]
+        x, y = ring_store.x, ring_store.y
+        edges = {}
+        occurrences = []
+        for r in range(len(ring_store.ring_offsets)):
+            if feedback.isCanceled():
+                return bytearray(), array('q')
+            start, end = ring_store.ring_vertices(r)
+            owner = ring_store.ring_owner[r]
+            # Vertici agganciati una volta sola: ogni vertice appartiene a due spigoli
+            keys = [(round(x[v] / tolerance), round(y[v] / tolerance)) for v in range(start, end)]
+            for a, b in zip(keys, keys[1:]):
+                edge_key = (a, b) if a < b else (b, a)
+                entry = edges.get(edge_key)
+                if entry is None:
+                    edges[edge_key] = entry = [len(occurrences), owner, -1]
+                elif entry[2] == -1 and entry[1] != owner:
+                    entry[2] = owner
+                occurrences.append(entry)
+        del edges
+
+        flags = ring_store.exception_flags
+        kept = bytearray(len(occurrences))
+        neighbours = array('q')
+        occurrence = 0
+        for r in range(len(ring_store.ring_offsets)):
+            if feedback.isCanceled():
+                return bytearray(), array('q')
+            start, end = ring_store.ring_vertices(r)
+            owner = ring_store.ring_owner[r]
+            for _ in range(end - start - 1):
+                first, first_owner, second_owner = occurrences[occurrence]
+                kept[occurrence] = occurrence == first or (
+                    bool(exception_values) and flags[owner] != flags[first_owner])
+                neighbours.append(second_owner if owner == first_owner else first_owner)
+                occurrence += 1
+        return kept, neighbours
+
+    def ring_edge_topology_vectorized(self, ring_store, exception_values, tolerance):
+        """Come ring_edge_topology, con chiavi intere su griglia e ordinamento NumPy; None se fuori scala."""
+        grid = []
+        for coords in (ring_store.x, ring_store.y):
+            scaled = np.rint(np.frombuffer(coords, dtype=np.float64) / tolerance)
+            if np.abs(scaled).max() >= self.MAX_GRID_COORDINATE:
+                return None
+            grid.append(scaled.astype(np.int64))
+        qx, qy = grid
+
+        ring_of_edge, first_vertex = self.ring_edge_index(ring_store)
+        order, group_start = self.sorted_key_groups(
+            qx[first_vertex], qy[first_vertex], qx[first_vertex + 1], qy[first_vertex + 1]
+        )
+        del grid, qx, qy, first_vertex
+
+        owner = np.frombuffer(ring_store.ring_owner, dtype=np.int32)[ring_of_edge].astype(np.int64)
+        flags = np.frombuffer(ring_store.exception_flags, dtype=np.int8).astype(bool) if exception_values else None
+        kept = self.kept_mask(owner, flags, order, group_start)
+
+        # Vicino: primo proprietario del gruppo diverso dal proprietario dello spigolo
+        count = len(order)
+        owner = owner[order]
+        starts = np.flatnonzero(group_start)
+        group_index = np.cumsum(group_start) - 1
+        first_owner = owner[starts][group_index]
+        candidates = np.where(owner != first_owner, np.arange(count), count)
+        second = np.minimum.reduceat(candidates, starts)
+        second_owner = np.where(second < count, owner[np.minimum(second, count - 1)], -1)
+        neighbours = np.empty(count, dtype=np.int64)
+        neighbours[order] = np.where(owner == first_owner, second_owner[group_index], first_owner)
+        return kept, neighbours
+
+    @staticmethod
+    def ring_edge_index(ring_store):
+        """Per ogni spigolo: anello di appartenenza e indice del primo vertice (array NumPy)."""
+        offsets = np.frombuffer(ring_store.ring_offsets, dtype=np.int64)
+        rings = np.arange(len(offsets))
+        edge_counts = np.diff(np.append(offsets, len(ring_store.x))) - 1
+        ring_of_edge = np.repeat(rings, edge_counts)
+        return ring_of_edge, np.arange(len(ring_of_edge)) + ring_of_edge
+
+    def ring_arc_runs(self, ring_store, kept, neighbours, feedback):
+        """Tratti (anello, primo spigolo, ultimo spigolo, vicino) di spigoli emessi consecutivi con lo
+        stesso vicino, e per anello se il poligono e a sinistra (area con segno e tipo di anello)."""
+        rings_count = len(ring_store.ring_offsets)
+        if np is not None and len(ring_store) and not isinstance(kept, bytearray):
+            ring_of_edge, first_vertex = self.ring_edge_index(ring_store)
+            x = np.frombuffer(ring_store.x, dtype=np.float64)
+            y = np.frombuffer(ring_store.y, dtype=np.float64)
+            cross = x[first_vertex] * y[first_vertex + 1] - x[first_vertex + 1] * y[first_vertex]
+            ring_first_edge = np.frombuffer(ring_store.ring_offsets, dtype=np.int64) - np.arange(rings_count)
+            twice_area = np.add.reduceat(cross, ring_first_edge)
+            del cross, first_vertex
+
+            same_next = np.zeros(len(kept), dtype=bool)
+            same_next[:-1] = (kept[:-1] & kept[1:] & (neighbours[:-1] == neighbours[1:])
+                              & (ring_of_edge[:-1] == ring_of_edge[1:]))
+            same_previous = np.zeros(len(kept), dtype=bool)
+            same_previous[1:] = same_next[:-1]
+            run_starts = np.flatnonzero(kept & ~same_previous)
+            run_ends = np.flatnonzero(kept & ~same_next)
+            runs = zip(ring_of_edge[run_starts].tolist(), run_starts.tolist(), run_ends.tolist(),
+                       neighbours[run_starts].tolist())
+            exterior = np.frombuffer(ring_store.ring_exterior, dtype=np.int8).astype(bool)
+            return runs, ((twice_area > 0) == exterior).tolist()
+
+        x, y = ring_store.x, ring_store.y
+        runs = []
+        polygon_on_left = []
+        edge = 0
+        for r in range(rings_count):
+            if feedback.isCanceled():
+                break
+            start, end = ring_store.ring_vertices(r)
+            twice_area = 0.0
+            for v in range(start, end - 1):
+                twice_area += x[v] * y[v + 1] - x[v + 1] * y[v]
+                if kept[edge]:
+                    if runs and runs[-1][0] == r and runs[-1][2] == edge - 1 and runs[-1][3] == neighbours[edge]:
+                        runs[-1][2] = edge
+                    else:
+                        runs.append([r, edge, edge, neighbours[edge]])
+                edge += 1
+            polygon_on_left.append((twice_area > 0) == bool(ring_store.ring_exterior[r]))
+        return runs, polygon_on_left
+
+    def build_arcs(self, ring_store, kept, neighbours, feedback):
+        """Archi (owner, coordinate, vicino, poligono a sinistra): tratti massimali di un anello con lo stesso vicino."""
+        runs, polygon_on_left = self.ring_arc_runs(ring_store, kept, neighbours, feedback)
+        x, y = ring_store.x, ring_store.y
+        for r, ring_runs in groupby(runs, key=itemgetter(0)):
+            if feedback.isCanceled():
+                return
+            ring_runs = [run[1:] for run in ring_runs]
+            start, end = ring_store.ring_vertices(r)
+            first_edge, last_edge = start - r, end - r - 2
+
+            # Tratti come intervalli di vertici (primo spigolo e + r, ultimo vertice e + r + 1)
+            pieces = [[(a + r, b + r + 1)] for a, b, _ in ring_runs]
+            # L'anello e chiuso: l'ultimo tratto prosegue nel primo se hanno lo stesso vicino
+            if (len(ring_runs) > 1 and ring_runs[0][0] == first_edge and ring_runs[-1][1] == last_edge
+                    and ring_runs[0][2] == ring_runs[-1][2]):
+                ring_runs.pop()
+                pieces[0] = pieces.pop() + [(start, pieces[0][0][1])]
+
+            owner = ring_store.ring_owner[r]
+            for (_, _, neighbour), ring_pieces in zip(ring_runs, pieces):
+                coords = [(x[ring_pieces[0][0]], y[ring_pieces[0][0]])]
+                for first, last in ring_pieces:
+                    coords.extend(zip(x[first + 1:last + 1], y[first + 1:last + 1]))
+                yield owner, coords, neighbour, polygon_on_left[r]
+
+    def write_arcs(self, arcs, segment_store, writer, feedback):
+        """Scrive gli archi con left_id/right_id e li restituisce come (owner, coordinate)."""
+        arcs_count = 0
+        for owner, coords, neighbour, polygon_on_left in arcs:
+            note_val, nro_val, id_val = segment_store.polygon_attributes_of(owner)
+            neighbour_id = segment_store.polygon_ids[neighbour] if neighbour >= 0 else None
+            if polygon_on_left:
+                left_id, right_id = id_val, neighbour_id
             else:
-                segments_dict[seg_key] = (seg_geom, note_val, nro_val, id_val)
+                left_id, right_id = neighbour_id, id_val
+            writer.write(self.polylines_geometry([coords]), [note_val, nro_val, id_val, left_id, right_id])
+            arcs_count += 1
+            yield owner, coords
+
+        feedback.pushInfo(self.tr('Archi topologici: {}').format(arcs_count))
+
+    def polylines_geometry(self, polylines):
+        """Geometria lineare (singola o multipla) da liste di coordinate."""
+        if len(polylines) == 1:
+            return QgsGeometry.fromPolylineXY([QgsPointXY(x, y) for x, y in polylines[0]])
+        return QgsGeometry.fromMultiPolylineXY(
+            [[QgsPointXY(x, y) for x, y in polyline] for polyline in polylines]
+        )
 
-        return list(segments_dict.values())
+    def create_exception_matcher(self, exception_values):
+        """Regex unica che cerca uno qualsiasi dei valori di eccezione (gia in maiuscolo)."""
+        if not exception_values:
+            return None
+        return re.compile('|'.join(re.escape(v) for v in exception_values))
 
-    def get_segment_key(self, p1, p2):
-        """Crea chiave univoca per segmento."""
-        coords1 = (round(p1.x(), 6), round(p1.y(), 6))
-        coords2 = (round(p2.x(), 6), round(p2.y(), 6))
+    def get_segment_key(self, x1, y1, x2, y2, tolerance=0.000001):
+        """Crea chiave univoca per segmento agganciando le coordinate alla griglia."""
+        coords1 = (round(x1 / tolerance), round(y1 / tolerance))
+        coords2 = (round(x2 / tolerance), round(y2 / tolerance))
         return (coords1, coords2) if coords1 < coords2 else (coords2, coords1)
 
-    def dissolve_lines_by_attributes(self, segments, sink, fields, field_name, feedback):
-        """Dissolve segmenti per (field_name, nro, id) usando linemerge."""
-        groups = {}
-        for seg_geom, note_val, nro_val, id_val in segments:
-            key = (note_val, nro_val, id_val)
-            if key not in groups:
-                groups[key] = []
-            groups[key].append(seg_geom)
-
-        for (note_val, nro_val, id_val), geoms in groups.items():
-            if len(geoms) == 1:
-                merged_geom = geoms[0]
+    def dissolve_lines_by_attributes(self, segment_store, lines, writer, feedback):
+        """Dissolve linee (owner, coordinate) per (field_name, nro, id) usando linemerge."""
+        # Ogni poligono ha un id univoco: (field_name, nro, id) identifica il proprietario.
+        # Le linee arrivano ordinate per proprietario, quindi i gruppi sono consecutivi
+        groups_count = 0
+        for owner, group in groupby(lines, key=itemgetter(0)):
+            if feedback.isCanceled():
+                break
+            polylines = [coords for _, coords in group]
+            groups_count += 1
+            if len(polylines) == 1:
+                merged_geom = self.polylines_geometry(polylines)
             else:
-                # Raccogli prima in una MultiLineString
-                multi_geom = QgsGeometry.collectGeometry(geoms)
-                # Poi applica linemerge per unire segmenti connessi
-                merged_geom = multi_geom.mergeLines()
+                # Unisci le linee connesse (equivalente a mergeLines)
+                with self.profiler.timer('Line merge'):
+                    chainer = LineChainer()
+                    for coords in polylines:
+                        chainer.add_line(coords)
+                    merged_geom = self.polylines_geometry(chainer.chains())
 
             if merged_geom and not merged_geom.isNull():
-                out_feature = QgsFeature(fields)
-                out_feature.setGeometry(merged_geom)
-                out_feature[field_name] = note_val
-                out_feature['nro'] = nro_val
-                out_feature['id'] = id_val
-                sink.addFeature(out_feature, QgsFeatureSink.FastInsert)
-
-        feedback.pushInfo(self.tr('Linee dissolte: {}').format(len(groups)))
+                writer.write(merged_geom, list(segment_store.polygon_attributes_of(owner)))
+
+        feedback.pushInfo(self.tr('Linee dissolte: {}').format(groups_count))
+        return groups_count
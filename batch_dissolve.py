@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Esecuzione batch di Dissolve Adjacent by Expression senza interfaccia grafica.
+
+I layer poligonali dei file in input (manifest o pattern glob) vengono
+distribuiti su un pool di processi; ogni processo inizializza QgsApplication
+una sola volta e riusa lo script dell'algoritmo per tutti i layer che riceve.
+Gli output sono scritti accanto agli input, in un GeoPackage per layer:
+
+  <file>_dissolve.gpkg            (un solo layer nel file)
+  <file>_<layer>_dissolve.gpkg    (piu layer nel file)
+
+con le tabelle dissolved, lines, lines_dissolved (e filtered se richiesto).
+
+Manifest: file JSON con una lista di percorsi o di oggetti
+  {"input": "...", "layer": "...", "parameters": {...}}
+oppure file di testo con un percorso per riga (# per i commenti).
+
+Uso:
+  python batch_dissolve.py "comuni/*.gpkg" --workers 8 --set FIELD_NAME=note
+  python batch_dissolve.py --manifest notte.json --parameters parametri.json --summary riepilogo.json
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from qgis_headless import init_qgis, load_algorithm_module
+
+OUTPUT_SUFFIX = '_dissolve.gpkg'
+
+# Output dell'algoritmo e tabella corrispondente nel GeoPackage di output
+OUTPUT_TABLES = {
+    'OUTPUT': 'dissolved',
+    'OUTPUT_LINES': 'lines',
+    'OUTPUT_LINES_DISSOLVED': 'lines_dissolved',
+}
+FILTERED_TABLE = 'filtered'
+
+# Stato di ciascun processo del pool
+_worker = {}
+
+
+def init_worker():
+    """Inizializzatore del pool: QGIS e algoritmo caricati una volta per processo."""
+    init_qgis()
+    _worker['algorithm'] = load_algorithm_module().DissolveAdjacentByExpressionAlgorithm()
+
+
+def parse_value(text):
+    """Valore di un parametro da riga di comando: JSON se valido, altrimenti stringa."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def read_manifest(path):
+    """Voci del manifest come dizionari {input, layer, parameters}."""
+    with open(path, encoding='utf-8') as manifest_file:
+        if path.lower().endswith('.json'):
+            entries = json.load(manifest_file)
+        else:
+            entries = [line.strip() for line in manifest_file]
+            entries = [line for line in entries if line and not line.startswith('#')]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    result = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {'input': entry}
+        # I percorsi relativi sono relativi al manifest
+        entry = dict(entry)
+        entry['input'] = os.path.join(base_dir, os.path.expanduser(entry['input']))
+        result.append(entry)
+    return result
+
+
+def expand_patterns(patterns):
+    """File che corrispondono ai pattern glob, esclusi gli output di esecuzioni precedenti."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(os.path.expanduser(pattern), recursive=True))
+        if not matches:
+            print('Nessun file per il pattern: {}'.format(pattern), file=sys.stderr)
+        paths.extend(path for path in matches if not path.endswith(OUTPUT_SUFFIX))
+    return [{'input': os.path.abspath(path)} for path in dict.fromkeys(paths)]
+
+
+def polygon_layers(path):
+    """Nomi dei layer poligonali del file (None per i formati a layer singolo)."""
+    from qgis.core import QgsDataProvider, QgsVectorLayer, QgsWkbTypes
+
+    layer = QgsVectorLayer(path, 'input', 'ogr')
+    if not layer.isValid():
+        raise ValueError('File non leggibile: {}'.format(path))
+    sublayers = layer.dataProvider().subLayers()
+    if len(sublayers) <= 1:
+        return [None] if layer.geometryType() == QgsWkbTypes.PolygonGeometry else []
+
+    names = []
+    for sublayer in sublayers:
+        name = sublayer.split(QgsDataProvider.SUBLAYER_SEPARATOR)[1]
+        candidate = QgsVectorLayer('{}|layername={}'.format(path, name), name, 'ogr')
+        if candidate.isValid() and candidate.geometryType() == QgsWkbTypes.PolygonGeometry:
+            names.append(name)
+    return names
+
+
+def build_tasks(entries, parameters):
+    """Un task per layer poligonale, dal piu grande al piu piccolo (bilanciamento del pool)."""
+    tasks = []
+    failures = []
+    for entry in entries:
+        path = entry['input']
+        try:
+            names = [entry['layer']] if entry.get('layer') else polygon_layers(path)
+        except ValueError as error:
+            failures.append({'input': path, 'layer': entry.get('layer'), 'status': 'error',
+                             'seconds': 0.0, 'error': str(error)})
+            continue
+        if not names:
+            print('Nessun layer poligonale in {}'.format(path), file=sys.stderr)
+
+        task_parameters = dict(parameters)
+        task_parameters.update(entry.get('parameters', {}))
+        stem = os.path.splitext(path)[0]
+        for name in names:
+            if len(names) == 1 and not entry.get('layer'):
+                output = stem + OUTPUT_SUFFIX
+            else:
+                output = '{}_{}{}'.format(stem, name, OUTPUT_SUFFIX)
+            tasks.append({
+                'input': path,
+                'layer': name,
+                'output': output,
+                'parameters': task_parameters,
+                'size': os.path.getsize(path) if os.path.exists(path) else 0,
+            })
+    tasks.sort(key=lambda task: -task['size'])
+    return tasks, failures
+
+
+def output_destination(path, table):
+    """Destinazione Processing per una tabella del GeoPackage di output."""
+    return "ogr:dbname='{}' table=\"{}\" (geom)".format(path.replace("'", "''"), table)
+
+
+def run_task(task):
+    """Esegue l'algoritmo su un layer nel processo del pool."""
+    from qgis.core import QgsProcessingContext, QgsProcessingFeedback, QgsVectorLayer
+
+    class Feedback(QgsProcessingFeedback):
+        """Feedback che conserva i messaggi di errore."""
+
+        def __init__(self):
+            super().__init__()
+            self.errors = []
+
+        def reportError(self, error, fatalError=False):
+            self.errors.append(error)
+            super().reportError(error, fatalError)
+
+    summary = {'input': task['input'], 'layer': task['layer'], 'output': task['output']}
+    start = time.perf_counter()
+    try:
+        uri = task['input'] if task['layer'] is None else '{}|layername={}'.format(task['input'], task['layer'])
+        layer = QgsVectorLayer(uri, task['layer'] or 'input', 'ogr')
+        if not layer.isValid():
+            raise ValueError('Layer non valido: {}'.format(uri))
+
+        if os.path.exists(task['output']):
+            os.remove(task['output'])
+
+        parameters = dict(task['parameters'])
+        parameters['INPUT'] = layer
+        for output, table in OUTPUT_TABLES.items():
+            parameters[output] = output_destination(task['output'], table)
+        if parameters.get('USE_FILTER'):
+            parameters['OUTPUT_FILTERED'] = output_destination(task['output'], FILTERED_TABLE)
+
+        algorithm = _worker['algorithm'].create()
+        context = QgsProcessingContext()
+        feedback = Feedback()
+        results, ok = algorithm.run(parameters, context, feedback)
+        if not ok:
+            raise RuntimeError('; '.join(feedback.errors) or 'esecuzione non riuscita')
+
+        summary['status'] = 'ok'
+        summary['features'] = layer.featureCount()
+        if 'METRICS' in results:
+            summary['metrics'] = json.loads(results['METRICS'])
+    except Exception as error:
+        summary['status'] = 'error'
+        summary['error'] = str(error)
+        summary['traceback'] = traceback.format_exc()
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def run_batch(tasks, workers, max_tasks_per_worker=None):
+    """Distribuisce i task sul pool e restituisce i riepiloghi in ordine di completamento."""
+    options = {}
+    if max_tasks_per_worker and sys.version_info >= (3, 11):
+        options['max_tasks_per_child'] = max_tasks_per_worker
+
+    # spawn: ogni processo parte pulito e inizializza QGIS per conto suo
+    context = multiprocessing.get_context('spawn')
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, **options) as executor:
+        futures = {executor.submit(run_task, task): task for task in tasks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            task = futures[future]
+            try:
+                summary = future.result()
+            except Exception as error:
+                # Processo del pool terminato (es. memoria esaurita)
+                summary = {'input': task['input'], 'layer': task['layer'], 'output': task['output'],
+                           'status': 'error', 'seconds': 0.0, 'error': repr(error)}
+            results.append(summary)
+            label = task['input'] if task['layer'] is None else '{} [{}]'.format(task['input'], task['layer'])
+            status = 'OK' if summary['status'] == 'ok' else 'ERRORE: ' + summary['error']
+            print('[{}/{}] {:>9.3f} s  {}  {}'.format(done, len(tasks), summary['seconds'], label, status))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dissolve Adjacent by Expression su molti layer.')
+    parser.add_argument('inputs', nargs='*', help='file o pattern glob (es. "comuni/**/*.gpkg")')
+    parser.add_argument('--manifest', help='manifest JSON o di testo con i file da elaborare')
+    parser.add_argument('--parameters', help='file JSON con i parametri dell\'algoritmo')
+    parser.add_argument('--set', action='append', default=[], metavar='NOME=VALORE',
+                        help='parametro dell\'algoritmo (ripetibile, valore JSON o stringa)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='processi del pool (default: numero di CPU)')
+    parser.add_argument('--max-tasks-per-worker', type=int,
+                        help='riavvia un processo dopo N layer (Python 3.11+)')
+    parser.add_argument('--summary', help='file JSON con il riepilogo dell\'esecuzione')
+    args = parser.parse_args()
+
+    parameters = {}
+    if args.parameters:
+        with open(args.parameters, encoding='utf-8') as parameters_file:
+            parameters.update(json.load(parameters_file))
+    for item in args.set:
+        name, separator, value = item.partition('=')
+        if not separator:
+            parser.error('Parametro non valido (atteso NOME=VALORE): {}'.format(item))
+        parameters[name] = parse_value(value)
+    # I processi del pool sono gia paralleli: niente sotto-processi per layer se non richiesti
+    parameters.setdefault('WORKERS', 1)
+
+    entries = read_manifest(args.manifest) if args.manifest else []
+    entries.extend(expand_patterns(args.inputs))
+    if not entries:
+        parser.error('Nessun input: indicare dei file, dei pattern glob o --manifest')
+
+    init_qgis()
+    tasks, results = build_tasks(entries, parameters)
+    start = time.perf_counter()
+    if tasks:
+        results.extend(run_batch(tasks, max(1, min(args.workers, len(tasks))), args.max_tasks_per_worker))
+    elapsed = time.perf_counter() - start
+
+    failures = [result for result in results if result['status'] != 'ok']
+    print('\n{} layer in {:.1f} s: {} completati, {} falliti'.format(
+        len(results), elapsed, len(results) - len(failures), len(failures)))
+    for failure in failures:
+        print('  {} {}: {}'.format(failure['input'], failure['layer'] or '', failure['error']))
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as summary_file:
+            json.dump({
+                'parameters': parameters,
+                'workers': args.workers,
+                'seconds': round(elapsed, 3),
+                'completed': len(results) - len(failures),
+                'failed': len(failures),
+                'layers': results
+            }, summary_file, indent=2, default=str)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
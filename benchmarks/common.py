@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Funzioni comuni dei benchmark: impronta degli output e, da qgis_headless.py
+nella radice del repository, avvio di QGIS senza interfaccia grafica e
+caricamento dello script dell'algoritmo.
+"""
+
+import hashlib
+import os
+import sys
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import QgsGeometry
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+
+# Avvio di QGIS e caricamento dello script sono condivisi con batch_dissolve.py
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+from qgis_headless import SCRIPT_PATH, init_qgis, load_algorithm_module  # noqa: E402,F401
+
+
+# Impronte calcolate per ogni output, dalla piu stretta alla piu debole:
+#   sha1      geometria e tutti gli attributi
+#   content   geometria, nro e valori del campo concatenato in ordine alfabetico
+#             (senza id, che dipende dall'ordine di scrittura)
+#   geometry  sola geometria di ogni feature
+#   segments  soli segmenti delle linee (stessa rete di linee, comunque divisa in feature)
+FINGERPRINT_KINDS = ['sha1', 'content', 'geometry', 'segments']
+
+
+def layer_fingerprint(layer, field_name='note'):
+    """Numero di feature e impronte degli output, indipendenti dall'ordine delle feature."""
+    field_index = layer.fields().indexOf(field_name)
+    nro_index = layer.fields().indexOf('nro')
+    digests = {kind: [] for kind in FINGERPRINT_KINDS}
+    for feature in layer.getFeatures():
+        geom = QgsGeometry(feature.geometry())
+        geom.normalize()
+        wkb = geom.asWkb().data()
+        attributes = [None if isinstance(v, QVariant) else v for v in feature.attributes()]
+
+        digest = hashlib.sha1(wkb)
+        digest.update(repr(attributes).encode('utf-8'))
+        digests['sha1'].append(digest.hexdigest())
+
+        note = attributes[field_index] if field_index >= 0 else None
+        tokens = sorted(str(note).split(',')) if note is not None else None
+        nro = attributes[nro_index] if nro_index >= 0 else None
+        digest = hashlib.sha1(wkb)
+        digest.update(repr((nro, tokens)).encode('utf-8'))
+        digests['content'].append(digest.hexdigest())
+
+        digests['geometry'].append(hashlib.sha1(wkb).hexdigest())
+
+        lines = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+        for line in lines:
+            for a, b in zip(line, line[1:]):
+                segment = sorted([(a.x(), a.y()), (b.x(), b.y())])
+                digests['segments'].append(hashlib.sha1(repr(segment).encode('ascii')).hexdigest())
+
+    fingerprint = {'features': len(digests['sha1'])}
+    for kind in FINGERPRINT_KINDS:
+        digests[kind].sort()
+        fingerprint[kind] = hashlib.sha1(''.join(digests[kind]).encode('ascii')).hexdigest()
+    return fingerprint
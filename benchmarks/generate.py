@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Generatore deterministico di coperture poligonali sintetiche per i benchmark.
+
+Tipi di copertura:
+  grid     griglia di quadrati unitari
+  voronoi  celle di Voronoi di punti casuali ritagliate sull'estensione
+
+Ogni feature ha un campo "note" nel formato "<prefisso><gruppo>|<progressivo>",
+compatibile con l'espressione di default dell'algoritmo; una quota di feature
+contiene anche il valore di eccezione.
+
+Uso:
+  python generate.py grid 10000 --groups 50 --exception-share 0.1 -o grid.gpkg
+"""
+
+import argparse
+import math
+import os
+import random
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsField,
+    QgsGeometry,
+    QgsPointXY,
+    QgsRectangle,
+    QgsVectorFileWriter,
+    QgsVectorLayer
+)
+
+from common import init_qgis
+
+KINDS = ('grid', 'voronoi')
+PREFIXES = ['CEC', 'PdCC', 'PdC', 'PEC', 'PI', 'PR.CS', 'Suevig']
+EXCEPTION_VALUE = 'VINCOLO'
+
+# Quota di feature che prende il gruppo del proprio blocco: crea cluster
+# adiacenti realistici invece di gruppi sparsi a caso
+DEFAULT_COHERENCE = 0.8
+
+
+def grid_geometries(size):
+    """Quadrati unitari in ordine per righe."""
+    side = math.ceil(math.sqrt(size))
+    for i in range(size):
+        x, y = i % side, i // side
+        yield QgsGeometry.fromRect(QgsRectangle(x, y, x + 1, y + 1))
+
+
+def voronoi_geometries(size, rng):
+    """Celle di Voronoi di punti casuali, ordinate per posizione del centroide."""
+    side = math.ceil(math.sqrt(size))
+    points = [QgsPointXY(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(size)]
+    extent = QgsRectangle(0, 0, side, side)
+    diagram = QgsGeometry.fromMultiPointXY(points).voronoiDiagram(QgsGeometry.fromRect(extent))
+
+    # L'ordine delle celle prodotte da GEOS non e garantito: ordinamento stabile
+    cells = []
+    for part in diagram.asGeometryCollection():
+        cell = part.intersection(QgsGeometry.fromRect(extent))
+        if not cell.isEmpty():
+            centroid = cell.centroid().asPoint()
+            cells.append((round(centroid.y(), 9), round(centroid.x(), 9), cell))
+    cells.sort(key=lambda item: (item[0], item[1]))
+    for _, _, cell in cells:
+        yield cell
+
+
+def note_value(rng, geom, serial, groups, block_side, blocks_per_row, exception_share, coherence):
+    """Valore del campo note: gruppo del blocco spaziale (o casuale) ed eventuale eccezione."""
+    if rng.random() < coherence:
+        center = geom.boundingBox().center()
+        block = int(center.x() // block_side) + int(center.y() // block_side) * blocks_per_row
+        group = block % groups
+    else:
+        group = rng.randrange(groups)
+
+    value = '{}{}|{}'.format(PREFIXES[group % len(PREFIXES)], group, serial)
+    if rng.random() < exception_share:
+        value += ' ' + EXCEPTION_VALUE
+    return value
+
+
+def create_layer(kind, size, groups=50, exception_share=0.1, seed=1, coherence=DEFAULT_COHERENCE):
+    """Layer in memoria con la copertura richiesta."""
+    if kind not in KINDS:
+        raise ValueError('Tipo di copertura non valido: {}'.format(kind))
+    if size < 1 or groups < 1:
+        raise ValueError('Numero di feature e di gruppi devono essere positivi')
+
+    rng = random.Random(seed)
+    layer = QgsVectorLayer('Polygon?crs=EPSG:3003', '{}_{}'.format(kind, size), 'memory')
+    provider = layer.dataProvider()
+    provider.addAttributes([QgsField('note', QVariant.String)])
+    layer.updateFields()
+
+    side = math.ceil(math.sqrt(size))
+    block_side = max(1.0, side / math.sqrt(groups))
+    blocks_per_row = math.ceil(side / block_side)
+    geometries = grid_geometries(size) if kind == 'grid' else voronoi_geometries(size, rng)
+
+    batch = []
+    for serial, geom in enumerate(geometries, start=1):
+        feature = QgsFeature(layer.fields())
+        feature.setGeometry(geom)
+        feature.setAttributes([
+            note_value(rng, geom, serial, groups, block_side, blocks_per_row, exception_share, coherence)
+        ])
+        batch.append(feature)
+        if len(batch) >= 10000:
+            provider.addFeatures(batch)
+            batch = []
+    provider.addFeatures(batch)
+    layer.updateExtents()
+    return layer
+
+
+def write_layer(layer, path):
+    """Salva il layer in GeoPackage."""
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = 'GPKG'
+    error = QgsVectorFileWriter.writeAsVectorFormatV3(
+        layer, path, QgsCoordinateTransformContext(), options
+    )[0]
+    if error != QgsVectorFileWriter.NoError:
+        raise RuntimeError('Scrittura di {} non riuscita'.format(path))
+
+
+def ensure_layer(data_dir, kind, size, groups=50, exception_share=0.1, seed=1):
+    """Percorso del GeoPackage del caso richiesto, generato solo se non esiste."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, '{}_{}_g{}_e{}_s{}.gpkg'.format(kind, size, groups, exception_share, seed))
+    if not os.path.exists(path):
+        write_layer(create_layer(kind, size, groups, exception_share, seed), path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera una copertura poligonale sintetica.')
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('size', type=int, help='numero di feature')
+    parser.add_argument('--groups', type=int, default=50, help='numero di gruppi distinti (default 50)')
+    parser.add_argument('--exception-share', type=float, default=0.1,
+                        help='quota di feature con il valore di eccezione (default 0.1)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', required=True, help='GeoPackage di output')
+    args = parser.parse_args()
+
+    init_qgis()
+    write_layer(create_layer(args.kind, args.size, args.groups, args.exception_share, args.seed), args.output)
+
+
+if __name__ == '__main__':
+    main()
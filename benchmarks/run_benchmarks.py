@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark dell'algoritmo su coperture sintetiche, senza interfaccia grafica.
+
+Per ogni caso (copertura, numero di feature, variante dei parametri) l'algoritmo
+viene eseguito in un processo separato, cosi il picco di memoria e quello del
+solo caso. Vengono raccolti:
+  - tempo totale e tempi per fase (profilazione interna dell'algoritmo)
+  - picco di memoria del processo
+  - impronta degli output (numero di feature e hash indipendente dall'ordine)
+
+Il confronto con benchmarks/baselines.json segnala le regressioni oltre la
+soglia e ogni differenza negli output. Gli output di ogni variante sono inoltre
+confrontati con quelli della variante default nella stessa esecuzione e, con
+--reference, con quelli di un altro script (es. la versione originale
+dell'algoritmo) eseguito con i soli parametri di base. Ogni confronto usa
+l'impronta piu stretta valida per la variante (vedi COMPARED_FINGERPRINTS):
+ad esempio id e ordine dei valori concatenati cambiano volutamente con i
+tasselli. Il codice di uscita e 1 se ci sono regressioni o differenze.
+
+Uso:
+  python run_benchmarks.py                       casi piccoli (1k, 10k)
+  python run_benchmarks.py --large               anche 100k e 1M feature
+  python run_benchmarks.py --update-baselines    salva i risultati come riferimento
+  python run_benchmarks.py --reference SCRIPT    confronta gli output con un altro script
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import (
+    BENCHMARK_DIR, DATA_DIR, FINGERPRINT_KINDS, SCRIPT_PATH, init_qgis, layer_fingerprint, load_algorithm_module
+)
+
+BASELINES_PATH = os.path.join(BENCHMARK_DIR, 'baselines.json')
+
+SIZES = [1000, 10000]
+LARGE_SIZES = [100000, 1000000]
+KINDS = ['grid', 'voronoi']
+
+# Valori dei parametri calcolati per ogni caso
+SIDECAR = '<sidecar>'  # file SQLite temporaneo del caso (cache incrementale, checkpoint)
+TILE = '<tile>'  # lato del tassello: TILE_FRACTION del lato maggiore dell'estensione
+
+TILE_FRACTION = 0.25
+
+# Varianti dei parametri dell'algoritmo
+VARIANTS = {
+    'default': {},
+    'coverage': {'COVERAGE_MODE': True},
+    'topology': {'TOPOLOGY_MODE': True},
+    'streaming': {'STREAMING': True},
+    'tiled': {'TILE_SIZE': TILE},
+    'parallel': {'WORKERS': 4},
+    'pipeline': {'PIPELINE_DEPTH': 1000},
+    'incremental': {'INCREMENTAL_CACHE': SIDECAR},
+    'resume': {'CHECKPOINT': SIDECAR, 'RESUME': True},
+}
+
+# Varianti misurate alla seconda esecuzione sullo stesso file SQLite: 'complete' se
+# la prima esecuzione arriva in fondo, 'interrupted' se e annullata dopo meta dei gruppi
+PREPARED_VARIANTS = {
+    'incremental': 'complete',
+    'resume': 'interrupted',
+}
+
+OUTPUTS = ['OUTPUT', 'OUTPUT_LINES', 'OUTPUT_LINES_DISSOLVED']
+
+# Impronta confrontata con la variante default quando una variante cambia volutamente
+# una parte degli output (le altre usano 'sha1'): con i tasselli cambiano id, ordine
+# dei valori concatenati dei cluster ricuciti e poligono proprietario dei segmenti
+# condivisi; in modalita topologica le linee sono archi invece di segmenti
+COMPARED_FINGERPRINTS = {
+    'topology': {'OUTPUT_LINES': 'segments'},
+    'tiled': {'OUTPUT': 'content', 'OUTPUT_LINES': 'geometry', 'OUTPUT_LINES_DISSOLVED': 'segments'},
+}
+
+# Impronta confrontata con lo script di riferimento: l'ordine dei valori concatenati e
+# gli id possono cambiare tra le versioni dell'algoritmo
+REFERENCE_FINGERPRINT = 'content'
+
+# Nome del caso eseguito con lo script di riferimento (--reference)
+REFERENCE_VARIANT = 'reference'
+
+# Sotto questa differenza assoluta (s) una fase non e considerata in regressione
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def case_name(kind, size, variant):
+    return '{}-{}-{}'.format(kind, size, variant)
+
+
+def run_case(kind, size, variant, groups, exception_share, seed, script_path=SCRIPT_PATH):
+    """Esegue un caso nel processo corrente e restituisce tempi, memoria e impronte.
+
+    I parametri non definiti dallo script (es. PROFILE in una versione precedente)
+    non vengono passati; in quel caso tempi per fase e memoria restano vuoti. Le
+    varianti in PREPARED_VARIANTS sono eseguite due volte e misurate alla seconda.
+    """
+    from qgis.core import QgsProcessingContext, QgsProcessingFeedback, QgsProcessingUtils, QgsVectorLayer
+    import generate
+
+    init_qgis()
+    path = generate.ensure_layer(DATA_DIR, kind, size, groups, exception_share, seed)
+    layer = QgsVectorLayer(path, 'input', 'ogr')
+
+    module = load_algorithm_module(script_path)
+    algorithm = module.DissolveAdjacentByExpressionAlgorithm().create()
+    sidecar_path = os.path.join(tempfile.gettempdir(), 'benchmark-{}.sqlite'.format(case_name(kind, size, variant)))
+    if os.path.exists(sidecar_path):
+        os.remove(sidecar_path)
+    extent = layer.extent()
+    parameters = {
+        'INPUT': layer,
+        'FIELD_NAME': 'note',
+        'EXPRESSION': algorithm.parameterDefinition('EXPRESSION').defaultValue(),
+        'USE_DUPLICATE_EXCEPTION': True,
+        'EXCEPTION_VALUES': generate.EXCEPTION_VALUE,
+        'PROFILE': True,
+    }
+    for name, value in VARIANTS.get(variant, {}).items():
+        if value == SIDECAR:
+            value = sidecar_path
+        elif value == TILE:
+            value = max(extent.width(), extent.height()) * TILE_FRACTION
+        parameters[name] = value
+    for output in OUTPUTS:
+        parameters[output] = 'TEMPORARY_OUTPUT'
+    parameters = {name: value for name, value in parameters.items()
+                  if algorithm.parameterDefinition(name) is not None}
+
+    preparation = PREPARED_VARIANTS.get(variant)
+    if preparation == 'complete':
+        algorithm.create().run(parameters, QgsProcessingContext(), QgsProcessingFeedback())
+    elif preparation == 'interrupted':
+        interrupted_run(module, algorithm.create(), parameters, groups // 2)
+
+    context = QgsProcessingContext()
+    feedback = QgsProcessingFeedback()
+    start = time.perf_counter()
+    results, ok = algorithm.run(parameters, context, feedback)
+    wall = time.perf_counter() - start
+    if not ok:
+        raise RuntimeError('Esecuzione non riuscita per {}'.format(case_name(kind, size, variant)))
+
+    metrics = json.loads(results['METRICS']) if results.get('METRICS') else {
+        'stages': [], 'timers': {}, 'peak_rss_kb': None
+    }
+    fingerprints = {}
+    for output in OUTPUTS:
+        if output not in results:
+            continue
+        output_layer = QgsProcessingUtils.mapLayerFromString(results[output], context)
+        fingerprints[output] = layer_fingerprint(output_layer, parameters['FIELD_NAME'])
+
+    if os.path.exists(sidecar_path):
+        os.remove(sidecar_path)
+    return {
+        'wall_s': round(wall, 6),
+        'stages': {stage['name']: stage['wall_s'] for stage in metrics['stages']},
+        'timers': {name: timer['wall_s'] for name, timer in metrics['timers'].items()},
+        'peak_rss_kb': metrics['peak_rss_kb'],
+        'fingerprints': fingerprints,
+    }
+
+
+def interrupted_run(module, algorithm, parameters, groups_before_cancel):
+    """Esecuzione annullata dopo groups_before_cancel gruppi registrati nel checkpoint."""
+    from qgis.core import QgsProcessingContext, QgsProcessingFeedback
+
+    feedback = QgsProcessingFeedback()
+    add_group = module.Checkpoint.add_group
+
+    def add_group_and_cancel(checkpoint, dissolved_results):
+        add_group(checkpoint, dissolved_results)
+        if checkpoint.groups_done >= groups_before_cancel:
+            feedback.cancel()
+
+    module.Checkpoint.add_group = add_group_and_cancel
+    try:
+        algorithm.run(parameters, QgsProcessingContext(), feedback)
+    finally:
+        module.Checkpoint.add_group = add_group
+
+
+def run_case_subprocess(kind, size, variant, args, script_path=SCRIPT_PATH):
+    """Esegue un caso in un processo Python separato (picco di memoria isolato)."""
+    command = [
+        sys.executable, os.path.abspath(__file__), '--run-case', kind, str(size), variant,
+        '--groups', str(args.groups), '--exception-share', str(args.exception_share), '--seed', str(args.seed),
+        '--script', script_path
+    ]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'errore'}
+    # L'ultima riga dell'output e il risultato JSON
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def regressions(name, result, baseline, threshold):
+    """Descrizioni delle regressioni di tempo e memoria e delle differenze di output."""
+    problems = []
+
+    def check(label, current, reference, min_delta):
+        if reference is None or current is None:
+            return
+        if current > reference * (1 + threshold) and current - reference > min_delta:
+            problems.append('{}: {} {:.3f} -> {:.3f} (+{:.0%})'.format(
+                name, label, reference, current, current / reference - 1 if reference else float('inf')))
+
+    check('tempo totale', result['wall_s'], baseline.get('wall_s'), MIN_REGRESSION_SECONDS)
+    for stage, seconds in result['stages'].items():
+        check(stage, seconds, baseline.get('stages', {}).get(stage), MIN_REGRESSION_SECONDS)
+    check('picco memoria (KB)', result['peak_rss_kb'], baseline.get('peak_rss_kb'), 0)
+
+    problems.extend(output_differences(name, result, baseline, 'riferimento'))
+    return problems
+
+
+def output_differences(name, result, expected, label, kinds=None):
+    """Descrizioni degli output di result diversi da quelli di expected.
+
+    kinds associa a un output l'impronta da confrontare (default 'sha1').
+    """
+    problems = []
+    for output, fingerprint in result['fingerprints'].items():
+        reference = expected.get('fingerprints', {}).get(output)
+        kind = (kinds or {}).get(output, 'sha1')
+        if reference is None or reference.get(kind) == fingerprint[kind]:
+            continue
+        problems.append('{}: output {} diverso da {} (impronta {}, {} feature, attese {})'.format(
+            name, output, label, kind, fingerprint['features'], reference['features']))
+    return problems
+
+
+def compared_kinds(variant, weakest='sha1'):
+    """Impronta da confrontare per ogni output della variante, non piu stretta di weakest."""
+    kinds = {}
+    for output in OUTPUTS:
+        kind = COMPARED_FINGERPRINTS.get(variant, {}).get(output, 'sha1')
+        kinds[output] = max(kind, weakest, key=FINGERPRINT_KINDS.index)
+    return kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark di Dissolve Adjacent by Expression.')
+    parser.add_argument('--large', action='store_true', help='aggiunge i casi da 100k e 1M feature')
+    parser.add_argument('--sizes', type=int, nargs='+', help='dimensioni dei casi (sostituisce i default)')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=KINDS)
+    parser.add_argument('--variants', nargs='+', choices=sorted(VARIANTS), default=['default'])
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--exception-share', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='regressione relativa tollerata (default 0.2 = 20%%)')
+    parser.add_argument('--update-baselines', action='store_true', help='salva i risultati come riferimento')
+    parser.add_argument('--output', help='file JSON con i risultati di questa esecuzione')
+    parser.add_argument('--reference', metavar='SCRIPT',
+                        help='script di riferimento (es. la versione originale) di cui confrontare gli output')
+    parser.add_argument('--run-case', nargs=3, metavar=('KIND', 'SIZE', 'VARIANT'), help=argparse.SUPPRESS)
+    parser.add_argument('--script', default=SCRIPT_PATH, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        kind, size, variant = args.run_case
+        result = run_case(kind, int(size), variant, args.groups, args.exception_share, args.seed, args.script)
+        print(json.dumps(result))
+        return 0
+
+    # La variante default e sempre eseguita per prima: e il termine di confronto delle altre
+    variants = ['default'] + [variant for variant in args.variants if variant != 'default']
+
+    sizes = args.sizes or (SIZES + LARGE_SIZES if args.large else SIZES)
+    baselines = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH, encoding='utf-8') as baselines_file:
+            baselines = json.load(baselines_file)
+
+    results = {}
+    problems = []
+    for size in sizes:
+        for kind in args.kinds:
+            reference = None
+            if args.reference:
+                reference_name = case_name(kind, size, REFERENCE_VARIANT)
+                reference = run_case_subprocess(kind, size, REFERENCE_VARIANT, args, os.path.abspath(args.reference))
+                if 'error' in reference:
+                    problems.append('{}: errore: {}'.format(reference_name, reference['error']))
+                    print('{:<28} ERRORE {}'.format(reference_name, reference['error']))
+                    reference = None
+                else:
+                    print('{:<28} {:>9.3f} s'.format(reference_name, reference['wall_s']))
+
+            for variant in variants:
+                name = case_name(kind, size, variant)
+                result = run_case_subprocess(kind, size, variant, args)
+                results[name] = result
+                if 'error' in result:
+                    problems.append('{}: errore: {}'.format(name, result['error']))
+                    print('{:<28} ERRORE {}'.format(name, result['error']))
+                    continue
+
+                print('{:<28} {:>9.3f} s {:>10} KB'.format(name, result['wall_s'], result['peak_rss_kb'] or '-'))
+                for stage, seconds in result['stages'].items():
+                    print('    {:<56} {:>9.3f} s'.format(stage, seconds))
+                if name in baselines:
+                    problems.extend(regressions(name, result, baselines[name], args.threshold))
+                default = results.get(case_name(kind, size, 'default'))
+                if variant != 'default' and default is not None and 'error' not in default:
+                    problems.extend(output_differences(
+                        name, result, default, 'variante default', compared_kinds(variant)))
+                if reference is not None:
+                    problems.extend(output_differences(
+                        name, result, reference, 'script di riferimento',
+                        compared_kinds(variant, REFERENCE_FINGERPRINT)))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.update_baselines:
+        baselines.update({name: result for name, result in results.items() if 'error' not in result})
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as baselines_file:
+            json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+        print('Riferimenti aggiornati: {}'.format(BASELINES_PATH))
+        return 0
+
+    if problems:
+        print('\nRegressioni o differenze di output:')
+        for problem in problems:
+            print('  ' + problem)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
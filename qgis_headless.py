@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Funzioni comuni agli script senza interfaccia grafica (batch_dissolve.py e
+benchmarks/): avvio di QgsApplication e caricamento dello script dell'algoritmo.
+"""
+
+import importlib.util
+import os
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'adjacent-dissolve-line-processor.py')
+
+_application = None
+
+
+def init_qgis():
+    """Inizializza QgsApplication senza GUI (una sola volta per processo)."""
+    global _application
+    if _application is None:
+        from qgis.core import QgsApplication
+        QgsApplication.setPrefixPath(os.environ.get('QGIS_PREFIX_PATH', '/usr'), True)
+        _application = QgsApplication([], False)
+        _application.initQgis()
+    return _application
+
+
+def load_algorithm_module(script_path=SCRIPT_PATH):
+    """Carica lo script dell'algoritmo come modulo (il nome del file non e importabile)."""
+    spec = importlib.util.spec_from_file_location('adjacent_dissolve_line_processor', script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+LineChainer confrontato con GEOS linemerge (shapely) su grafi casuali.
+
+La classe viene estratta dallo script senza importarlo, quindi il test non
+richiede QGIS. L'ordine delle catene e il loro verso devono coincidere con
+quelli di GEOS.
+"""
+
+import ast
+import math
+import os
+import random
+
+import pytest
+
+shapely_ops = pytest.importorskip('shapely.ops')
+shapely_geometry = pytest.importorskip('shapely.geometry')
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'adjacent-dissolve-line-processor.py')
+
+
+def load_line_chainer():
+    """Classe LineChainer dello script, compilata da sola (dipende solo da math)."""
+    with open(SCRIPT_PATH, encoding='utf-8') as script_file:
+        tree = ast.parse(script_file.read(), SCRIPT_PATH)
+    class_node = next(node for node in tree.body
+                      if isinstance(node, ast.ClassDef) and node.name == 'LineChainer')
+    namespace = {'math': math}
+    exec(compile(ast.Module(body=[class_node], type_ignores=[]), SCRIPT_PATH, 'exec'), namespace)
+    return namespace['LineChainer']
+
+
+LineChainer = load_line_chainer()
+
+
+def geos_chains(lines):
+    merged = shapely_ops.linemerge(shapely_geometry.MultiLineString(lines))
+    parts = merged.geoms if hasattr(merged, 'geoms') else [merged]
+    return [[tuple(int(value) for value in point) for point in part.coords] for part in parts]
+
+
+def chainer_chains(lines):
+    chainer = LineChainer()
+    for line in lines:
+        chainer.add_line(line)
+    return chainer.chains()
+
+
+def random_lines(rng, max_vertices):
+    """Linee tra pochi nodi di una griglia: nodi di grado diverso, anelli e linee ripetute."""
+    nodes = [(rng.randint(0, 4), rng.randint(0, 4)) for _ in range(rng.randint(2, 9))]
+    lines = []
+    for _ in range(rng.randint(2, 12)):
+        line = [rng.choice(nodes)]
+        for _ in range(rng.randint(1, max_vertices - 1)):
+            point = rng.choice(nodes)
+            if point != line[-1]:
+                line.append(point)
+        if len(line) >= 2:
+            lines.append(line)
+    return lines
+
+
+@pytest.mark.parametrize('max_vertices', [2, 4])
+def test_chains_match_geos_linemerge(max_vertices):
+    rng = random.Random(5)
+    mismatches = []
+    for _ in range(3000):
+        lines = random_lines(rng, max_vertices)
+        if len(lines) < 2:
+            continue
+        if chainer_chains(lines) != geos_chains(lines):
+            mismatches.append(lines)
+    assert not mismatches, mismatches[:3]
+
+
+def test_square_ring_keeps_majority_orientation():
+    lines = [[(0, 0), (1, 0)], [(1, 0), (1, 1)], [(0, 1), (1, 1)], [(0, 1), (0, 0)]]
+    assert chainer_chains(lines) == geos_chains(lines)
+
+
+def test_zero_length_lines_are_ignored():
+    assert chainer_chains([[(0, 0), (0, 0)], [(0, 0), (1, 0), (1, 0)]]) == [[(0, 0), (1, 0)]]